@@ -0,0 +1,286 @@
+"""Benchmark the dashboard's load, index, query, facet and chart hot paths on synthetic exports.
+
+Usage:
+    python benchmark.py [--rows 6000,60000,600000] [--repeat 5] [--output bench.json]
+
+For every scale a synthetic yearly export following the real schema is
+written to a scratch directory, loaded through the same snapshot pipeline
+as the dashboard and timed stage by stage: first the shared structures
+built once per dataset version, then, per filter scenario, the work of a
+rerun with a new filter set (the facet counts, both query backends and
+the charts). Results are printed (or written) as JSON so runs can be
+compared over time.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import main
+
+# Practice areas with their share of entries in the full-year export
+PRACTICE_AREAS = {
+    'Corporate & Securities': 0.55,
+    'Litigation': 0.22,
+    'Real Estate & Land Use': 0.06,
+    'Fintech & Financial Services': 0.04,
+    'Trademark/Copyright': 0.04,
+    'Patents': 0.03,
+    '*No Practice Group Selected': 0.03,
+    'General Counsel Services': 0.02,
+    'Pro Bono': 0.01
+}
+BILLING_METHODS = {'Hourly': 0.98, 'Flat Rate': 0.015, 'Contingency fee': 0.005}
+MATTER_STATUSES = {'Open': 0.97, 'Closed': 0.025, 'Pending': 0.005}
+MATTER_LOCATIONS = ['California', 'Texas', 'New York', 'Florida', 'Washington', 'Illinois']
+MATTER_DESCRIPTIONS = [
+    'General Corporate', 'Intellectual property services', 'Outside General Counsel',
+    'Financing', 'Commercial Lease', 'Employment Dispute', 'Trademark Prosecution', 'M&A'
+]
+# Hourly rate range of each attorney level
+LEVEL_RATES = {
+    'Senior Counsel': (550, 990),
+    'Mid-Level Counsel': (350, 550),
+    'Document Specialist': (150, 250),
+    'Paralegal': (150, 250),
+    'Other': (0, 300)
+}
+# Filter sets timed at every scale, as overrides of the dashboard's default filters
+FILTER_SCENARIOS = {
+    'default': lambda meta: {},
+    'latest_year': lambda meta: {'quarter': None},
+    'one_attorney': lambda meta: {'attorneys': meta['top_attorneys'][:1]},
+    'practice_and_level': lambda meta: {
+        'practice_areas': ['Corporate & Securities', 'Litigation'],
+        'attorney_levels': ['Senior Counsel']
+    },
+    'min_amount_and_rates': lambda meta: {'min_amount': 500.0, 'rate_range': (400.0, 800.0)},
+    'many_clients': lambda meta: {'quarter': None, 'companies': meta['companies'][::3]},
+    'exclude_flagged': lambda meta: {'exclude_quality': list(main.QUALITY_CHECKS)}
+}
+
+logger = logging.getLogger('benchmark')
+
+def _choice(rng, weights, size):
+    """Draw ``size`` keys of a {value: weight} map."""
+    values = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    return np.array(values, dtype=object)[rng.choice(len(values), size=size, p=p / p.sum())]
+
+def generate_time_entries(n_rows, seed=0, start='2024-01-01', months=14):
+    """Return a synthetic yearly export (all columns as strings) of ``n_rows`` time entries.
+
+    Attorneys come from ATTORNEY_LEVELS with a rate drawn for their level,
+    matters belong to companies and practice areas, entries spread over the
+    business days of ``months`` months, and hours and values split into
+    billed, unbilled and non-billable the way the export does.
+    """
+    rng = np.random.default_rng(seed)
+
+    attorneys = np.array(list(main.ATTORNEY_LEVELS), dtype=object)
+    levels = [main.ATTORNEY_LEVELS[name] for name in attorneys]
+    rates = np.array([rng.integers(*LEVEL_RATES[level]) // 5 * 5 for level in levels], dtype=float)
+    working_days = rng.choice([250, 260, 262], size=len(attorneys))
+
+    n_matters = max(20, n_rows // 8)
+    n_companies = max(10, int(n_matters * 0.7))
+    companies = np.array([f"Client {i:05d} LLC" for i in range(n_companies)], dtype=object)
+    matter_company = rng.integers(0, n_companies, n_matters)
+    matter_description = rng.choice(np.array(MATTER_DESCRIPTIONS, dtype=object), n_matters)
+    matter_practice = _choice(rng, PRACTICE_AREAS, n_matters)
+    matter_method = _choice(rng, BILLING_METHODS, n_matters)
+    matter_status = _choice(rng, MATTER_STATUSES, n_matters)
+    matter_location = rng.choice(np.array(MATTER_LOCATIONS, dtype=object), n_matters)
+    matter_originator = rng.choice(attorneys, n_matters)
+    matter_open = pd.Timestamp(start) - pd.to_timedelta(rng.integers(0, 1500, n_matters), unit='D')
+    matter_number = np.array([
+        f"{i:05d}-{companies[c]}-{d}" for i, (c, d) in enumerate(zip(matter_company, matter_description))
+    ], dtype=object)
+
+    # Entries: skewed towards busy attorneys and matters, on business days only
+    attorney = rng.zipf(1.3, n_rows) % len(attorneys)
+    matter = rng.zipf(1.2, n_rows) % n_matters
+    days = pd.bdate_range(start, pd.Timestamp(start) + pd.DateOffset(months=months) - pd.Timedelta(days=1))
+    dates = days[rng.integers(0, len(days), n_rows)]
+
+    tracked = np.round(rng.gamma(1.5, 1.0, n_rows), 1) + 0.1
+    billable = np.where(rng.random(n_rows) < 0.85, tracked, 0.0)
+    billed = np.where(rng.random(n_rows) < 0.45, billable, 0.0)
+    unbilled = billable - billed
+    non_billable = tracked - billable
+    rate = rates[attorney]
+    flat_fee = matter_method[matter] == 'Flat Rate'
+    billed_value = np.where(flat_fee, np.round(rng.integers(5, 50, n_rows) * 100.0), billed * rate)
+
+    def fmt(values):
+        return np.char.mod('%.1f', values).astype(object)
+
+    columns = {
+        'Activity day': dates.day.astype(str),
+        'Activity month': dates.month.astype(str),
+        'Activity quarter': dates.quarter.astype(str),
+        'Activity date': dates.strftime('%m/%d/%Y'),
+        'Non-billable hours': fmt(non_billable),
+        'Non-billable hours value': fmt(non_billable * rate),
+        'Billed & Unbilled hours': fmt(billable),
+        'Billed & Unbilled hours value': fmt(unbilled * rate + billed_value),
+        'Unbilled hours': fmt(unbilled),
+        'Unbilled hours value': fmt(unbilled * rate),
+        'Billed hours': fmt(billed),
+        'Billed hours value': fmt(billed_value),
+        'Utilization rate': np.char.mod('%.2f', billable / working_days[attorney] * 100).astype(object),
+        'Tracked hours': fmt(tracked),
+        'Matter number': matter_number[matter],
+        'Matter description': matter_description[matter],
+        'Matter status': matter_status[matter],
+        'Contact company or full name': companies[matter_company][matter],
+        'Practice area': matter_practice[matter],
+        'Originating attorney': matter_originator[matter],
+        'Matter open date': matter_open.strftime('%m/%d/%Y')[matter],
+        'Matter pending date': None,
+        'Matter close date': None,
+        'Billable matter': np.where(matter_method[matter] == 'Contingency fee', '0', '1'),
+        'Client reference number': None,
+        'Matter location': matter_location[matter],
+        'User full name (first, last)': attorneys[attorney],
+        'User yearly working days': working_days[attorney].astype(str),
+        'User rate': fmt(rate),
+        'Contact full name (last, first)': None,
+        'Contact type': 'Company',
+        'Company name': companies[matter_company][matter],
+        'Contact title': None,
+        'Matter billing method': matter_method[matter]
+    }
+    return pd.DataFrame(columns)
+
+def time_stage(fn, repeat):
+    """Run ``fn`` ``repeat`` times and return its timing summary and last return value."""
+    timings = []
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - started)
+    summary = {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'runs': repeat
+    }
+    return summary, value
+
+def benchmark_scale(n_rows, repeat, work_dir, seed=0):
+    """Time every stage on a synthetic export of ``n_rows`` entries."""
+    scale_dir = os.path.join(work_dir, f"rows-{n_rows}")
+    os.makedirs(scale_dir, exist_ok=True)
+    path = os.path.join(scale_dir, 'export.csv')
+    snapshot_dir = os.path.join(scale_dir, 'snapshot')
+
+    started = time.perf_counter()
+    generate_time_entries(n_rows, seed).to_csv(path, index=False)
+    timings = {}
+    result = {
+        'rows': n_rows,
+        'export_bytes': os.path.getsize(path),
+        'generate_s': time.perf_counter() - started,
+        'timings': timings
+    }
+
+    # load_and_process_data serves what load_exports returns through the background dataset refresher
+    def cold_load():
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        return main.load_exports([path], snapshot_dir, mode='full')
+    timings['load_cold'], _ = time_stage(cold_load, 1)
+    timings['load_warm'], df = time_stage(lambda: main.load_exports([path], snapshot_dir), repeat)
+    result['memory_bytes'] = int(df.memory_usage(deep=True).sum())
+
+    timings['scan_data_quality'], _ = time_stage(lambda: main.scan_data_quality(df), repeat)
+    timings['build_filter_index'], _ = time_stage(lambda: main.FilterIndex(df), 1)
+    timings['build_search_index'], search_index = time_stage(lambda: main.SearchIndex(df), 1)
+    timings['build_rollup_cube'], cube = time_stage(lambda: main.build_rollup_cube(df), 1)
+    store_path = os.path.join(scale_dir, 'entries.sqlite')
+    timings['build_sqlite_store'], _ = time_stage(lambda: main.build_sqlite_store(df, store_path), 1)
+    timings['fit_forecast_models'], _ = time_stage(lambda: main.ForecastModels(cube), repeat)
+    timings['search'], _ = time_stage(lambda: search_index.search('client 0001 general'), repeat)
+    
+    # The dashboard builds its shared structures once per dataset version before serving it, so the
+    # scenarios below only time the work of a rerun; the SQLite store is the one written above
+    main.get_shared(df, 'sqlite_store', lambda df: store_path)
+    timings['warm_dataset'], _ = time_stage(lambda: main.warm_dataset(df), 1)
+    
+    meta = {
+        'top_attorneys': df['User full name (first, last)'].value_counts().index.tolist(),
+        'companies': sorted(df['Company name'].dropna().unique())
+    }
+    defaults = main.default_filters(df)
+    result['scenarios'] = {}
+    for name, overrides in FILTER_SCENARIOS.items():
+        filters = {**defaults, **overrides(meta)}
+        scenario = {}
+        index = main.get_filter_index(df)
+        scenario['facet_counts'], _ = time_stage(lambda: index.facet_counts(filters), repeat)
+        # What get_filtered_results runs on a result cache miss
+        results = {}
+        for backend, query in main.QUERY_BACKENDS.items():
+            scenario[f'query_{backend}'], results[backend] = time_stage(lambda: query(df, filters), repeat)
+        filtered = results['pandas']
+        scenario['get_figure'], _ = time_stage(
+            lambda: [main.get_figure({**filtered, 'figures': {}}, chart) for chart in main.CHARTS], repeat
+        )
+        scenario['source'] = filtered['source']
+        scenario['filtered_rows'] = int(filtered['row_count'])
+        result['scenarios'][name] = scenario
+        logger.info("%d rows, %s: %d entries match (from the %s)", n_rows, name, filtered['row_count'], filtered['source'])
+    return result
+
+def run_benchmarks(scales, repeat, seed=0):
+    """Benchmark every scale in a scratch directory and return the JSON-ready report."""
+    work_dir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    try:
+        return {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+                'pipeline_version': main.PIPELINE_VERSION
+            },
+            'repeat': repeat,
+            'seed': seed,
+            'scales': [benchmark_scale(n_rows, repeat, work_dir, seed) for n_rows in scales]
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def parse_args(argv):
+    """Parse the benchmark command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard hot paths on synthetic data.")
+    parser.add_argument('--rows', default='6000,60000,600000',
+                        help="Comma-separated entry counts to benchmark (default: 1x, 10x and 100x the sample export)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data generator")
+    parser.add_argument('--output', help="Write the JSON report here instead of printing it")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    report = run_benchmarks([int(rows) for rows in args.rows.split(',')], args.repeat, args.seed)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
@@ -1,180 +1,1102 @@
 import streamlit as st
+from streamlit import runtime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+import plotly.io as pio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager, suppress
+from datetime import date, datetime
+import argparse
 import calendar
+import functools
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import openpyxl
+except ImportError:  # Optional: Excel exports are offered only when it is installed
+    openpyxl = None
+try:
+    import fcntl
+except ImportError:  # Not on Windows, where snapshots are not locked across processes
+    fcntl = None
 
 # Configuration and setup
 st.set_page_config(page_title="Legal Dashboard", layout="wide")
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_and_process_data():
-    """Load and process the CSV file and add attorney level information."""
+DATA_FILE = 'Test_Full_Year.csv'
+# Exports combined into one dataset, comma-separated (any mix of the EXPORT_VARIANTS formats)
+DATA_FILES = os.environ.get('DASHBOARD_DATA_FILES', DATA_FILE).split(',')
+SNAPSHOT_DIR = '.dashboard_cache'
+# 'incremental' re-processes only changed year/month partitions, 'full' rebuilds everything
+INGEST_MODE = os.environ.get('DASHBOARD_INGEST_MODE', 'incremental')
+# Stream the export in chunks of this many rows when ingesting (0 reads it whole)
+INGEST_CHUNK_ROWS = int(os.environ.get('DASHBOARD_CHUNK_ROWS', '0'))
+# Load only the most recent months with entries (0 loads the full history)
+HISTORY_MONTHS = int(os.environ.get('DASHBOARD_HISTORY_MONTHS', '0'))
+# Seconds between background checks of the exports for changes (0 disables background refresh)
+REFRESH_SECONDS = float(os.environ.get('DASHBOARD_REFRESH_SECONDS', '60'))
+# 'local' loads the exports in every process; 'shared' attaches read-only to the memory-mapped
+# columns (and rollup cube) published by `python main.py publish`, so worker processes share one copy of them
+DATASET_SOURCE = os.environ.get('DASHBOARD_DATASET_SOURCE', 'local')
+SHARED_COLUMNS_DIR = os.path.join(SNAPSHOT_DIR, 'columns')
+# Dataset versions whose published columns and SQLite stores are kept on disk (pinned sessions and
+# other workers may still be using the previous one)
+SHARED_VERSIONS_KEPT = 2
+# Bump whenever process_time_entries or the store layout changes so stale snapshots are rebuilt
+# (it is part of the dataset version, so stores derived from older layouts are never reused either)
+PIPELINE_VERSION = 8
+
+# Hour, value and rate columns coerced to numbers on load
+MEASURE_COLUMNS = [
+    'Tracked hours',
+    'Billed & Unbilled hours',
+    'Billed & Unbilled hours value',
+    'Billed hours',
+    'Billed hours value',
+    'Non-billable hours',
+    'Non-billable hours value',
+    'Unbilled hours',
+    'Unbilled hours value',
+    'User rate',
+    'Utilization rate'
+]
+# Processed columns and how each is coerced: 'date', 'measure' (numeric, missing -> 0),
+# 'number' (numeric, missing stays missing) or 'text'
+CANONICAL_SCHEMA = {
+    'Activity day': 'text',
+    'Activity month': 'text',
+    'Activity quarter': 'text',
+    'Activity date': 'date',
+    **{col: 'measure' for col in MEASURE_COLUMNS},
+    'Matter number': 'text',
+    'Matter description': 'text',
+    'Matter status': 'text',
+    'Matter stage': 'text',
+    'Contact company or full name': 'text',
+    'Practice area': 'text',
+    'Originating attorney': 'text',
+    'Matter open date': 'date',
+    'Matter pending date': 'date',
+    'Matter close date': 'date',
+    'Billable matter': 'text',
+    'Client reference number': 'text',
+    'Matter location': 'text',
+    'User full name (first, last)': 'text',
+    'User yearly working days': 'number',
+    'Contact full name (last, first)': 'text',
+    'Contact type': 'text',
+    'Company name': 'text',
+    'Contact title': 'text',
+    'Matter billing method': 'text'
+}
+# Known export formats: the columns that identify each, and the renames onto the canonical schema
+EXPORT_VARIANTS = {
+    # Yearly export (Test_Full_Year.csv)
+    'billed_unbilled': {
+        'signature': ['Billed & Unbilled hours', 'Billed & Unbilled hours value'],
+        'renames': {}
+    },
+    # Monthly export (Test.csv)
+    'billable': {
+        'signature': ['Billable hours', 'Billable hours amount'],
+        'renames': {
+            'Billable hours': 'Billed & Unbilled hours',
+            'Billable hours amount': 'Billed & Unbilled hours value',
+            'Billed hours amount': 'Billed hours value',
+            'Non-billable hours amount': 'Non-billable hours value',
+            'Unbilled hours amount': 'Unbilled hours value'
+        }
+    }
+}
+
+# Multiselect filters and the column each one matches against
+DIMENSION_FILTERS = {
+    'months': 'Activity month',
+    'attorney_levels': 'Attorney level',
+    'attorneys': 'User full name (first, last)',
+    'originating_attorneys': 'Originating attorney',
+    'practice_areas': 'Practice area',
+    'locations': 'Matter location',
+    'matter_status': 'Matter status',
+    'billable_matter': 'Billable matter',
+    'billing_methods': 'Matter billing method',
+    'companies': 'Company name',
+    'clients': 'Contact full name (last, first)',
+    'matters': 'Matter description',
+    'matter_numbers': 'Matter number'
+}
+# Multiselect filters fed by the sidebar search instead of option lists, with the label of their matches
+SEARCH_FILTERS = {
+    'matter_numbers': 'Matter number',
+    'matters': 'Matter',
+    'companies': 'Company',
+    'clients': 'Client'
+}
+# Most ranked matches a search offers
+SEARCH_RESULT_LIMIT = 20
+# Thresholds on group totals: filter name -> (grouping columns, measure summed over the other filters);
+# the first grouping column the export fills is used (monthly exports carry no client columns)
+GROUP_THRESHOLDS = {
+    'min_hours': (('User full name (first, last)',), 'Billed & Unbilled hours'),
+    'min_client_hours': (('Contact company or full name', 'Matter description'), 'Tracked hours')
+}
+# Columns with a value -> rows index (filter and threshold columns), and columns kept sorted for range filters
+INDEXED_DIMENSIONS = list(dict.fromkeys(
+    ['year', 'Activity quarter'] + list(DIMENSION_FILTERS.values())
+    + [column for columns, _ in GROUP_THRESHOLDS.values() for column in columns]
+))
+INDEXED_RANGES = ['Activity date', 'User rate', 'Billed & Unbilled hours value']
+# Group totals within this of a threshold reach it (sums of hours like 0.1 land just below the exact total)
+GROUP_THRESHOLD_TOLERANCE = 0.005
+# Additive measures pre-aggregated by the rollup cube, and the cube's grain
+ADDITIVE_MEASURES = [
+    'Tracked hours',
+    'Billed & Unbilled hours',
+    'Billed & Unbilled hours value',
+    'Billed hours',
+    'Billed hours value',
+    'Non-billable hours',
+    'Non-billable hours value',
+    'Unbilled hours',
+    'Unbilled hours value'
+]
+CUBE_DIMENSIONS = ['Activity date'] + INDEXED_DIMENSIONS + ['User rate']
+# Where metrics and chart aggregates are computed: 'pandas' (in-process) or 'sqlite' (shared on-disk store)
+QUERY_BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+# Columns loaded into the SQLite store, and the ones it indexes
+SQL_COLUMNS = ['Activity date'] + INDEXED_DIMENSIONS + MEASURE_COLUMNS + ['Data quality flags']
+SQL_INDEXED_COLUMNS = ['Activity date', 'User full name (first, last)', 'Practice area', 'Matter description']
+# Most points (attorneys) or bars (practice areas) a chart sends unless full detail is requested
+CHART_POINT_BUDGET = 50
+# Trend panel grains (pandas period frequencies), breakdowns and measures
+TREND_GRAINS = {'Day': 'D', 'Week': 'W', 'Month': 'M', 'Quarter': 'Q'}
+TREND_BREAKDOWNS = {
+    'Attorney': 'User full name (first, last)',
+    'Practice area': 'Practice area',
+    'Attorney level': 'Attorney level'
+}
+TREND_MEASURES = ['Hours', 'Revenue', 'Utilization']
+# Most series a trend chart plots (the largest by billable hours)
+TREND_SERIES_LIMIT = 10
+# Forecast series besides the firm total (filter name -> column), the metrics projected to year-end
+# (metric -> measure column) and the days of daily history each model is fit on
+FORECAST_SERIES = {'attorneys': 'User full name (first, last)', 'practice_areas': 'Practice area'}
+FORECAST_MEASURES = {'billable_hours': 'Billed & Unbilled hours', 'total_revenue': 'Billed & Unbilled hours value'}
+FORECAST_HISTORY_DAYS = 365
+# Filters that define the compared time window; every other filter applies to all compared periods
+TIME_FILTERS = ['year', 'quarter', 'months', 'date_range']
+# Windows computed by the comparison mode, and the labels the baseline choice shows
+COMPARISON_PERIODS = ['current', 'prior', 'year_ago']
+COMPARISON_BASELINES = {'Previous period': 'prior', 'Same period last year': 'year_ago'}
+# Drilldown levels (client -> matter -> attorney, then entries) and the entry columns shown at the leaf
+DRILLDOWN_LEVELS = ['Contact company or full name', 'Matter number', 'User full name (first, last)']
+DRILLDOWN_ENTRY_COLUMNS = [
+    'Activity date', 'Tracked hours', 'Billed & Unbilled hours', 'Billed hours',
+    'Billed & Unbilled hours value', 'Billed hours value', 'User rate', 'Matter billing method'
+]
+# Capacity engine grains, and the billable hours expected of an attorney per working day
+CAPACITY_GRAINS = {'Month': 'M', 'Quarter': 'Q', 'Year': 'Y'}
+CAPACITY_HOURS_PER_DAY = float(os.environ.get('DASHBOARD_CAPACITY_HOURS_PER_DAY', '8'))
+# Data-quality checks run on load, and the bit each sets in an entry's 'Data quality flags'
+QUALITY_CHECKS = {
+    'Duplicate entry': 1,
+    'Rate mismatch': 2,
+    'Outlier day': 4,
+    'Unmapped attorney': 8,
+    'Missing date': 16
+}
+# Columns that must all match for entries to count as duplicates
+DUPLICATE_KEY_COLUMNS = [
+    'Activity date', 'User full name (first, last)', 'Matter number', 'Matter description',
+    'Tracked hours', 'Billed & Unbilled hours', 'Billed & Unbilled hours value', 'Billed hours'
+]
+# Largest share by which an hourly entry's value may differ from hours x User rate (discounts are common)
+RATE_MISMATCH_TOLERANCE = 0.5
+# Attorney days whose tracked hours lie this many standard deviations above the attorney's daily mean,
+# among attorneys with at least OUTLIER_MIN_DAYS days of entries
+OUTLIER_Z_SCORE = 3.0
+OUTLIER_MIN_DAYS = 5
+# Number of filter sets whose results are kept in the shared result cache
+RESULT_CACHE_SIZE = 256
+# Selections a result keeps for the panels, left out of stored results (they are rebuilt on first use)
+RESULT_SELECTION_KEYS = ('rows', 'entry_mask')
+# Results pre-built by `python main.py report`, picked up by the dashboard's result cache
+RESULT_STORE_DIR = os.path.join(SNAPSHOT_DIR, 'results')
+# Name of the presets the report CLI builds when no presets file is given: one per quarter of the
+# latest year that has entries (see default_report_presets)
+REPORT_PRESET_NAME = 'q{quarter}'
+# Decimals the report metrics are written with (hundredths of an hour, cents)
+REPORT_DECIMALS = 2
+# Exports prepared for download (one directory per dataset version), and the entries written per chunk
+EXPORT_DIR = os.path.join(SNAPSHOT_DIR, 'exports')
+EXPORT_CHUNK_ROWS = 50_000
+# Entry columns exported, and the tables an export can hold (the entries or one of the chart aggregates)
+EXPORT_COLUMNS = list(CANONICAL_SCHEMA) + ['Attorney level']
+EXPORT_TABLES = {'Entries': None, 'By attorney': 'attorney', 'By practice area': 'practice', 'Hours split': 'hours'}
+# Most data rows an Excel sheet holds (one row is the header)
+EXCEL_MAX_ROWS = 1_048_575
+# Largest rounding error accepted when downcasting a measure column to float32
+FLOAT32_TOLERANCE = 0.005
+# Show the pipeline timings panel to every session (single sessions can open it with ?debug=1)
+DEBUG_PANEL = os.environ.get('DASHBOARD_DEBUG', '0') == '1'
+# Trace Python allocations from startup so every stage reports its peak memory (slows the app down;
+# peaks are process-wide, so they are only meaningful with one session running)
+PROFILE_MEMORY = os.environ.get('DASHBOARD_PROFILE_MEMORY', '0') == '1'
+# File the JSON stage records are appended to ('-' for stderr); unset, they are not written
+STAGE_LOG = os.environ.get('DASHBOARD_STAGE_LOG', '')
+
+logger = logging.getLogger(__name__)
+# Structured (JSON) per-stage timing records
+stage_logger = logging.getLogger(f"{__name__}.stages")
+stage_logger.propagate = False  # records only go to STAGE_LOG, never to the root handlers
+stage_logger.setLevel(logging.INFO if STAGE_LOG else logging.WARNING)
+if STAGE_LOG and not stage_logger.handlers:  # the dashboard re-runs this module on every rerun
+    stage_handler = logging.StreamHandler() if STAGE_LOG == '-' else logging.FileHandler(STAGE_LOG)
+    stage_handler.setFormatter(logging.Formatter('%(message)s'))
+    stage_logger.addHandler(stage_handler)
+
+if PROFILE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# Attorney levels mapping
+ATTORNEY_LEVELS = {
+    'Aaron Swerdlow': 'Senior Counsel',
+    'Aidan Toombs': 'Mid-Level Counsel',
+    'Alexander Gershen': 'Senior Counsel',
+    'Alexander Slafkosky': 'Senior Counsel',
+    'Alfred Bridi': 'Senior Counsel',
+    'Aliona Ierega': 'Mid-Level Counsel',
+    'Amy Duvanich': 'Senior Counsel',
+    'Andres Idarraga': 'Senior Counsel',
+    'Andy Baxter': 'Mid-Level Counsel',
+    'Antigone Peyton': 'Senior Counsel',
+    'Ayala Magder': 'Senior Counsel',
+    'Benjamin Golopol': 'Mid-Level Counsel',
+    'Brian Detwiler': 'Senior Counsel',
+    'Brian Elliott': 'Senior Counsel',
+    'Brian Hicks': 'Senior Counsel',
+    'Brian McEvoy': 'Senior Counsel',
+    'Brian Scherer': 'Senior Counsel',
+    'Caitlin Cunningham': 'Mid-Level Counsel',
+    'Cary Ullman': 'Senior Counsel',
+    'Channah Rose': 'Mid-Level Counsel',
+    'Charles Caliman': 'Senior Counsel',
+    'Charles Wallace': 'Senior Counsel',
+    'Chris Geyer': 'Senior Counsel',
+    'Chris Jones': 'Mid-Level Counsel',
+    'Christopher Grewe': 'Senior Counsel',
+    'Chuck Kraus': 'Senior Counsel',
+    'Corey Pedersen': 'Senior Counsel',
+    'Darren Collins (DS)': 'Document Specialist',
+    'David Lundeen': 'Senior Counsel',
+    'Derek Gilman': 'Senior Counsel',
+    'Donica Forensich': 'Mid-Level Counsel',
+    'Dori Karjian': 'Senior Counsel',
+    'Doug Mitchell': 'Senior Counsel',
+    'Elliott Gee (DS)': 'Document Specialist',
+    'Emma Thompson': 'Senior Counsel',
+    'Eric Blatt': 'Senior Counsel',
+    'Erica Shepard': 'Senior Counsel',
+    'Garrett Ordower': 'Senior Counsel',
+    'Gregory Winter': 'Senior Counsel',
+    'Hannah Valdez': 'Mid-Level Counsel',
+    'Heather Cantua': 'Mid-Level Counsel',
+    'Henry Ciocca': 'Senior Counsel',
+    'Jacqueline Post Ladha': 'Senior Counsel',
+    'James Cashel': 'Mid-Level Counsel',
+    'James Creedon': 'Senior Counsel',
+    'Jamie Wells': 'Senior Counsel',
+    'Jason Altieri': 'Senior Counsel',
+    'Jason Harrison': 'Mid-Level Counsel',
+    'Jeff Lord': 'Senior Counsel',
+    'Jeff Love': 'Senior Counsel',
+    'Jenna Geuke': 'Mid-Level Counsel',
+    'Joanne Wolforth': 'Mid-Level Counsel',
+    'John Mitnick': 'Senior Counsel',
+    'Jonathan Van Loo': 'Senior Counsel',
+    'Joseph Kiefer': 'Mid-Level Counsel',
+    'Josh Banerje': 'Mid-Level Counsel',
+    'Julie Snyder': 'Senior Counsel',
+    'Julien Apollon': 'Mid-Level Counsel',
+    'Justin McAnaney': 'Mid-Level Counsel',
+    'Katy Barreto': 'Senior Counsel',
+    'Katy Reamon': 'Mid-Level Counsel',
+    'Kimberly Griffin': 'Mid-Level Counsel',
+    'Kirby Drake': 'Senior Counsel',
+    'Kristen Dayley': 'Senior Counsel',
+    'Kristin Bohm': 'Mid-Level Counsel',
+    'Lauren Titolo': 'Mid-Level Counsel',
+    'Lindsey Altmeyer': 'Senior Counsel',
+    'M. Sidney Donica': 'Senior Counsel',
+    'Marissa Fox': 'Senior Counsel',
+    'Mary Spooner': 'Senior Counsel',
+    'Matthew Angelo': 'Senior Counsel',
+    'Matthew Dowd (DS)': 'Document Specialist',
+    'Maureen Bumgarner': 'Mid-Level Counsel',
+    'Melissa Balough': 'Senior Counsel',
+    'Melissa Clarke': 'Senior Counsel',
+    'Michael Keskey': 'Mid-Level Counsel',
+    'Michelle Maticic': 'Senior Counsel',
+    'Natasha Fedder': 'Senior Counsel',
+    'Nicole Baldocchi': 'Senior Counsel',
+    'Nora Wong': 'Mid-Level Counsel',
+    'Ornella Bourne': 'Mid-Level Counsel',
+    'Rainer Scarton': 'Mid-Level Counsel',
+    'Robert Gans': 'Senior Counsel',
+    'Robin Shofner': 'Senior Counsel',
+    'Robyn Marcello': 'Mid-Level Counsel',
+    'Sabina Schiller': 'Mid-Level Counsel',
+    'Samer Korkor': 'Senior Counsel',
+    'Sara Rau Frumkin': 'Senior Counsel',
+    'Scale LLP': 'Other',
+    'Scott Wiegand': 'Senior Counsel',
+    'Shailika Kotiya': 'Mid-Level Counsel',
+    'Shannon Straughan': 'Senior Counsel',
+    'Stephen Bosco': 'Mid-Level Counsel',
+    'Steve Forbes': 'Senior Counsel',
+    'Steve Zagami, Paralegal': 'Paralegal',
+    'Thomas Soave': 'Mid-Level Counsel',
+    'Thomas Stine': 'Senior Counsel',
+    'Tim Furin': 'Senior Counsel',
+    'Trey Calver': 'Senior Counsel',
+    'Tyler Hayden': 'Mid-Level Counsel',
+    'Whitney Joubert': 'Senior Counsel',
+    'Zach Ruby': 'Mid-Level Counsel'
+}
+
+# Pipeline instrumentation
+_stage_state = threading.local()
+
+def _stage_stack():
+    """Return this thread's stack of open stage records."""
+    if not hasattr(_stage_state, 'stack'):
+        _stage_state.stack = []
+        _stage_state.records = None
+    return _stage_state.stack
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Time a pipeline stage, yielding its record for the stage to fill in ``rows_out`` and ``cache``.
+
+    Every record carries the wall time, the rows in and out, the cache
+    outcome ('hit' / 'miss') and, while tracemalloc is tracing, the peak
+    memory allocated during the stage. Records are logged as JSON lines and
+    collected by the enclosing pipeline_run, if any.
+    """
+    stack = _stage_stack()
+    record = {'stage': name, 'depth': len(stack), 'rows_in': rows_in, 'rows_out': None, 'cache': None,
+              'wall_ms': None, 'peak_memory_mb': None, 'error': None}
+    if _stage_state.records is not None:
+        _stage_state.records.append(record)
+    
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Fold the peak so far into the parent before resetting it for this stage
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+        tracemalloc.reset_peak()
+        record['_start'] = record['_peak'] = current
+    
+    stack.append(record)
+    started = time.perf_counter()
     try:
-        # Load the CSV file
-        df = pd.read_csv('Test_Full_Year.csv')
-        
-        # Convert date strings to datetime objects
-        date_columns = ['Activity date', 'Matter open date', 'Matter pending date', 'Matter close date']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], format='%m/%d/%Y', errors='coerce')
-        
-        # Convert numeric columns with robust error handling
-        numeric_columns = [
-            'Tracked hours',
-            'Billed & Unbilled hours',
-            'Billed & Unbilled hours value',
-            'Billed hours',
-            'Billed hours value',
-            'Non-billable hours',
-            'Non-billable hours value',
-            'Unbilled hours',
-            'Unbilled hours value',
-            'User rate',
-            'Utilization rate'
-        ]
+        yield record
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record['wall_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        stack.pop()
+        if tracing and tracemalloc.is_tracing():
+            peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+            record['peak_memory_mb'] = round((peak - record.pop('_start')) / 1e6, 3)
+            if stack:
+                stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+        else:
+            record.pop('_peak', None)
+            record.pop('_start', None)
+        if stage_logger.isEnabledFor(logging.INFO):
+            stage_logger.info(json.dumps({'event': 'stage', **record}, default=str))
+
+def instrumented(name):
+    """Decorate a pipeline function to run as a stage, counting the rows of its frame argument and result."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+            with stage(name, rows_in) as record:
+                result = fn(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    record['rows_out'] = len(result)
+                return result
+        return wrapper
+    return decorate
+
+def mark_cache_miss():
+    """Flag the innermost open stage as a cache miss (called from the body of a memoized function)."""
+    stack = _stage_stack()
+    if stack:
+        stack[-1]['cache'] = 'miss'
+
+@contextmanager
+def pipeline_run():
+    """Collect the stage records of one dashboard rerun into the yielded list."""
+    _stage_stack()
+    records = []
+    _stage_state.records = records
+    try:
+        yield records
+    finally:
+        _stage_state.records = None
+
+def file_fingerprint(path, previous=None, prefix_size=None):
+    """Return the size, mtime and SHA-256 content hash of a source file.
+
+    The hash is reused from ``previous`` when size and mtime are unchanged,
+    so an untouched export is not re-read just to be hashed. When
+    ``prefix_size`` is given, the hash of the file's first ``prefix_size``
+    bytes is also returned as ``prefix_sha256`` to detect pure appends.
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous and all(previous.get(key) == value for key, value in fingerprint.items()):
+        fingerprint['sha256'] = previous['sha256']
+        fingerprint['newline_terminated'] = previous.get('newline_terminated', False)
+        return fingerprint
+    
+    digest = hashlib.sha256()
+    last_block = b''
+    with open(path, 'rb') as f:
+        if prefix_size is not None and prefix_size <= stat.st_size:
+            remaining = prefix_size
+            while remaining:
+                last_block = f.read(min(1 << 20, remaining))
+                digest.update(last_block)
+                remaining -= len(last_block)
+            fingerprint['prefix_sha256'] = digest.copy().hexdigest()
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+            last_block = block
+    fingerprint['sha256'] = digest.hexdigest()
+    fingerprint['newline_terminated'] = last_block.endswith(b'\n')
+    return fingerprint
+
+def read_export(source):
+    """Read a raw time-entry export, keeping every column as text."""
+    return pd.read_csv(source, dtype=str)
+
+def detect_export_variant(columns):
+    """Return the name of the export variant whose signature columns are all present."""
+    for name, variant in EXPORT_VARIANTS.items():
+        if all(col in columns for col in variant['signature']):
+            return name
+    raise ValueError(f"Unrecognized export format with columns: {', '.join(columns)}")
+
+@instrumented('process_time_entries')
+def process_time_entries(df):
+    """Normalize a raw export of any known variant to the canonical schema and add attorney levels.
+
+    Columns are renamed per EXPORT_VARIANTS and coerced per CANONICAL_SCHEMA
+    in one pass: measures missing from the export become 0, while missing
+    dates, numbers and text stay missing instead of becoming ''.
+    """
+    variant = EXPORT_VARIANTS[detect_export_variant(df.columns)]
+    df = df.rename(columns=variant['renames'])
+    missing = pd.Series(np.nan, index=df.index, dtype=object)
+    
+    columns = {}
+    for col, kind in CANONICAL_SCHEMA.items():
+        values = df[col] if col in df.columns else missing
+        if kind == 'date':
+            values = pd.to_datetime(values, format='%m/%d/%Y', errors='coerce')
+        elif kind == 'measure':
+            values = pd.to_numeric(values, errors='coerce').fillna(0).astype('float64')
+        elif kind == 'number':
+            values = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            values = values.astype(object)
+        columns[col] = values
+    processed = pd.DataFrame(columns)
+    
+    # Derive what some variants do not export
+    dates = processed['Activity date']
+    if 'Activity quarter' not in df.columns:
+        processed['Activity quarter'] = dates.dt.quarter.astype('Int64').astype(str).where(dates.notna())
+    if 'Activity month' not in df.columns:
+        processed['Activity month'] = dates.dt.month.astype('Int64').astype(str).where(dates.notna())
+    if 'User rate' not in df.columns:
+        hours = processed['Billed & Unbilled hours']
+        processed['User rate'] = (
+            processed['Billed & Unbilled hours value'] / hours.where(hours > 0)
+        ).round(2).fillna(0)
+    
+    # Convert Matter description to string
+    processed['Matter description'] = processed['Matter description'].fillna('').astype(str)
+    
+    # Clean attorney names and add level
+    processed['User full name (first, last)'] = processed['User full name (first, last)'].str.strip()
+    processed['Attorney level'] = processed['User full name (first, last)'].map(ATTORNEY_LEVELS).fillna('Unknown')
+    
+    # Add year column for filtering (float so every partition agrees, with or without NaT)
+    processed['year'] = dates.dt.year.astype('float64')
+    
+    return processed
+
+def _write_atomic(path, write):
+    """Write a file through a temporary sibling so readers never see a partial file."""
+    tmp_path = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:  # including the dashboard stopping the script for a rerun
+        with suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+def _prune_versions(paths, current, kept=SHARED_VERSIONS_KEPT):
+    """Delete all but the ``kept`` most recently written of the per-version ``paths``, never ``current``."""
+    def written(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0  # Already removed by another worker
+    
+    for stale in sorted(paths, key=written)[:-kept]:
+        if stale == current:
+            continue
+        if os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+        else:
+            with suppress(FileNotFoundError):
+                os.remove(stale)
+
+def _write_json(path, payload):
+    """Atomically write a JSON document."""
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+    _write_atomic(path, write)
+
+def partition_keys(raw):
+    """Return the year * 100 + month partition key of each raw row (0 for invalid dates)."""
+    dates = pd.to_datetime(raw['Activity date'], format='%m/%d/%Y', errors='coerce')
+    return (dates.dt.year * 100 + dates.dt.month).fillna(0).astype('int64').to_numpy()
+
+def _partition_dir(snapshot_dir, key):
+    """Return the directory holding the Parquet parts of one year/month partition."""
+    if key == 0:
+        return os.path.join(snapshot_dir, 'partitions', 'year=unknown')
+    return os.path.join(snapshot_dir, 'partitions', f'year={key // 100}', f'month={key % 100:02d}')
+
+def _partition_digests(raw, keys):
+    """Return the row count and content hash of every partition in a raw export.
+
+    The content hash is the sum of the row hashes modulo 2**64, so it does
+    not depend on row order and can be accumulated chunk by chunk.
+    """
+    if len(raw) == 0:
+        return {}
+    hashes = pd.util.hash_pandas_object(raw, index=False).to_numpy()
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    sums = np.add.reduceat(hashes[order], starts)
+    counts = np.diff(np.r_[starts, len(keys)])
+    return {
+        str(key): {'rows': int(count), 'hash': str(total)}
+        for key, count, total in zip(sorted_keys[starts], counts, sums)
+    }
+
+def _add_digests(partitions, digests):
+    """Accumulate partition digests of more rows into ``partitions`` in place."""
+    for key, digest in digests.items():
+        existing = partitions.get(key, {'rows': 0, 'hash': '0'})
+        partitions[key] = {
+            'rows': existing['rows'] + digest['rows'],
+            'hash': str((int(existing['hash']) + int(digest['hash'])) % 2 ** 64)
+        }
+
+def _write_parts(snapshot_dir, processed, keys, tag):
+    """Atomically write one Parquet part per partition present in ``processed``."""
+    for key, part in processed.groupby(keys, sort=False):
+        partition_dir = _partition_dir(snapshot_dir, int(key))
+        os.makedirs(partition_dir, exist_ok=True)
+        part_path = os.path.join(partition_dir, f'part-{tag}.parquet')
+        _write_atomic(part_path, lambda tmp: part.to_parquet(tmp, index=False))
+
+def _export_chunks(path, chunk_rows):
+    """Return a callable yielding the raw export whole, or in chunks of ``chunk_rows`` rows."""
+    if chunk_rows:
+        return lambda: pd.read_csv(path, dtype=str, chunksize=chunk_rows)
+    raw = read_export(path)
+    return lambda: [raw]
+
+@instrumented('ingest_partitions')
+def _ingest_partitions(path, snapshot_dir, previous, chunk_rows=INGEST_CHUNK_ROWS):
+    """Process only the partitions whose raw rows differ from ``previous``.
+
+    With ``chunk_rows`` the export is streamed twice, once to hash the
+    partitions and once to process the changed ones, so memory is bounded
+    by the chunk size rather than by the export size.
+    """
+    chunks = _export_chunks(path, chunk_rows)
+    partitions = {}
+    for raw in chunks():
+        _add_digests(partitions, _partition_digests(raw, partition_keys(raw)))
+    changed = [int(key) for key, digest in partitions.items() if previous.get(key) != digest]
+    
+    for key in changed + [int(key) for key in set(previous) - set(partitions)]:
+        shutil.rmtree(_partition_dir(snapshot_dir, key), ignore_errors=True)
+    
+    if changed:
+        for chunk_number, raw in enumerate(chunks()):
+            keys = partition_keys(raw)
+            rows = np.isin(keys, changed)
+            if rows.any():
+                processed = process_time_entries(raw[rows].reset_index(drop=True))
+                _write_parts(snapshot_dir, processed, keys[rows], f'{chunk_number:05d}')
+    return partitions
+
+@instrumented('ingest_append')
+def _ingest_append(path, snapshot_dir, manifest, chunk_rows=INGEST_CHUNK_ROWS):
+    """Process only the bytes appended since the last ingest, adding them as new partition parts."""
+    appended_at = manifest['source']['size']
+    partitions = dict(manifest['partitions'])
+    with open(path, 'rb') as f:
+        columns = pd.read_csv(io.BytesIO(f.readline()), dtype=str).columns
+        f.seek(appended_at)
+        try:
+            reader = pd.read_csv(f, dtype=str, header=None, names=columns, chunksize=chunk_rows or None)
+        except pd.errors.EmptyDataError:
+            return partitions
         
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        for chunk_number, raw in enumerate(reader if chunk_rows else [reader]):
+            keys = partition_keys(raw)
+            _add_digests(partitions, _partition_digests(raw, keys))
+            _write_parts(snapshot_dir, process_time_entries(raw), keys, f'append{appended_at}-{chunk_number:05d}')
+    return partitions
+
+@instrumented('read_partitions')
+def _read_partitions(snapshot_dir, keys):
+    """Load the given processed partitions, memory-mapping their Parquet parts."""
+    tables = [
+        pq.read_table(part_path, memory_map=True)
+        for key in sorted(keys, key=int)
+        for part_path in sorted(glob.glob(os.path.join(_partition_dir(snapshot_dir, int(key)), 'part-*.parquet')))
+    ]
+    if not tables:
+        return pd.DataFrame()
+    # Parts written from different deltas may disagree on all-null columns
+    return pa.concat_tables(tables, promote_options='default').to_pandas()
+
+@instrumented('compact_schema')
+def apply_compact_schema(df):
+    """Store dimensions as categoricals and measures as float32 where the precision allows.
+
+    A measure is downcast when every entry stays within FLOAT32_TOLERANCE;
+    totals stay exact enough because aggregations sum in float64 (see
+    column_total). Memory use before and after is recorded in
+    ``df.attrs['memory_usage']``.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    
+    for col in df.columns:
+        if df[col].dtype == object and df[col].nunique() <= len(df) // 2:
+            df[col] = df[col].astype('category')
+    
+    for col in MEASURE_COLUMNS:
+        if col in df.columns and df[col].dtype == np.float64:
+            values = df[col].to_numpy()
+            compact = values.astype(np.float32)
+            entry_error = np.nanmax(np.abs(compact - values), initial=0)
+            if entry_error <= FLOAT32_TOLERANCE:
+                df[col] = compact
+    
+    after = int(df.memory_usage(deep=True).sum())
+    df.attrs['memory_usage'] = {'before': before, 'after': after}
+    logger.info("Processed frame memory: %.1f MB -> %.1f MB", before / 1e6, after / 1e6)
+    return df
+
+def column_total(df, col):
+    """Return the sum of a measure column, accumulated in float64 even when it is stored as float32."""
+    return float(np.nansum(df[col].to_numpy('float64')))
+
+def grouped_totals(df, by, columns):
+    """Return the per-group sums of measure columns, accumulated in float64, with ``by`` as a column."""
+    return df[columns].astype('float64').groupby(df[by], observed=True).sum().reset_index()
+
+@contextmanager
+def snapshot_lock(snapshot_dir):
+    """Hold an exclusive lock on a snapshot directory, so no process reads partitions another is rewriting."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file closes
+        yield
+
+@instrumented('load_snapshot')
+def load_snapshot(path=DATA_FILE, snapshot_dir=SNAPSHOT_DIR, mode=INGEST_MODE, history_months=HISTORY_MONTHS,
+                  compact=True):
+    """Return the processed frame from its partitioned Parquet store, re-processing only what changed.
+
+    In ``incremental`` mode an export that only grew is handled by parsing
+    just the appended bytes; any other change re-processes the year/month
+    partitions whose rows differ. ``full`` mode rebuilds every partition.
+    With ``history_months`` only the most recent months with entries are
+    loaded, so the frame never holds the full history. The snapshot is
+    locked throughout, as every worker process loads from the same one.
+    """
+    with snapshot_lock(snapshot_dir):
+        manifest_path = os.path.join(snapshot_dir, 'manifest.json')
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get('pipeline_version') != PIPELINE_VERSION:
+            manifest = {}
         
-        # Convert Matter description to string
-        df['Matter description'] = df['Matter description'].fillna('').astype(str)
+        previous = manifest.get('source')
+        fingerprint = file_fingerprint(path, previous, prefix_size=previous['size'] if previous else None)
+        prefix_sha256 = fingerprint.pop('prefix_sha256', None)
         
-        # Add missing columns if they don't exist
-        required_columns = [
-            'Activity quarter', 'Activity month', 'Originating attorney', 
-            'Practice area', 'Matter location', 'Matter status', 
-            'Billable matter', 'Matter billing method', 
-            'Company name', 'Contact full name (last, first)'
-        ]
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = ''
-        
-        # Attorney levels mapping
-        attorney_levels = {
-            'Aaron Swerdlow': 'Senior Counsel',
-            'Aidan Toombs': 'Mid-Level Counsel',
-            'Alexander Gershen': 'Senior Counsel',
-            'Alexander Slafkosky': 'Senior Counsel',
-            'Alfred Bridi': 'Senior Counsel',
-            'Aliona Ierega': 'Mid-Level Counsel',
-            'Amy Duvanich': 'Senior Counsel',
-            'Andres Idarraga': 'Senior Counsel',
-            'Andy Baxter': 'Mid-Level Counsel',
-            'Antigone Peyton': 'Senior Counsel',
-            'Ayala Magder': 'Senior Counsel',
-            'Benjamin Golopol': 'Mid-Level Counsel',
-            'Brian Detwiler': 'Senior Counsel',
-            'Brian Elliott': 'Senior Counsel',
-            'Brian Hicks': 'Senior Counsel',
-            'Brian McEvoy': 'Senior Counsel',
-            'Brian Scherer': 'Senior Counsel',
-            'Caitlin Cunningham': 'Mid-Level Counsel',
-            'Cary Ullman': 'Senior Counsel',
-            'Channah Rose': 'Mid-Level Counsel',
-            'Charles Caliman': 'Senior Counsel',
-            'Charles Wallace': 'Senior Counsel',
-            'Chris Geyer': 'Senior Counsel',
-            'Chris Jones': 'Mid-Level Counsel',
-            'Christopher Grewe': 'Senior Counsel',
-            'Chuck Kraus': 'Senior Counsel',
-            'Corey Pedersen': 'Senior Counsel',
-            'Darren Collins (DS)': 'Document Specialist',
-            'David Lundeen': 'Senior Counsel',
-            'Derek Gilman': 'Senior Counsel',
-            'Donica Forensich': 'Mid-Level Counsel',
-            'Dori Karjian': 'Senior Counsel',
-            'Doug Mitchell': 'Senior Counsel',
-            'Elliott Gee (DS)': 'Document Specialist',
-            'Emma Thompson': 'Senior Counsel',
-            'Eric Blatt': 'Senior Counsel',
-            'Erica Shepard': 'Senior Counsel',
-            'Garrett Ordower': 'Senior Counsel',
-            'Gregory Winter': 'Senior Counsel',
-            'Hannah Valdez': 'Mid-Level Counsel',
-            'Heather Cantua': 'Mid-Level Counsel',
-            'Henry Ciocca': 'Senior Counsel',
-            'Jacqueline Post Ladha': 'Senior Counsel',
-            'James Cashel': 'Mid-Level Counsel',
-            'James Creedon': 'Senior Counsel',
-            'Jamie Wells': 'Senior Counsel',
-            'Jason Altieri': 'Senior Counsel',
-            'Jason Harrison': 'Mid-Level Counsel',
-            'Jeff Lord': 'Senior Counsel',
-            'Jeff Love': 'Senior Counsel',
-            'Jenna Geuke': 'Mid-Level Counsel',
-            'Joanne Wolforth': 'Mid-Level Counsel',
-            'John Mitnick': 'Senior Counsel',
-            'Jonathan Van Loo': 'Senior Counsel',
-            'Joseph Kiefer': 'Mid-Level Counsel',
-            'Josh Banerje': 'Mid-Level Counsel',
-            'Julie Snyder': 'Senior Counsel',
-            'Julien Apollon': 'Mid-Level Counsel',
-            'Justin McAnaney': 'Mid-Level Counsel',
-            'Katy Barreto': 'Senior Counsel',
-            'Katy Reamon': 'Mid-Level Counsel',
-            'Kimberly Griffin': 'Mid-Level Counsel',
-            'Kirby Drake': 'Senior Counsel',
-            'Kristen Dayley': 'Senior Counsel',
-            'Kristin Bohm': 'Mid-Level Counsel',
-            'Lauren Titolo': 'Mid-Level Counsel',
-            'Lindsey Altmeyer': 'Senior Counsel',
-            'M. Sidney Donica': 'Senior Counsel',
-            'Marissa Fox': 'Senior Counsel',
-            'Mary Spooner': 'Senior Counsel',
-            'Matthew Angelo': 'Senior Counsel',
-            'Matthew Dowd (DS)': 'Document Specialist',
-            'Maureen Bumgarner': 'Mid-Level Counsel',
-            'Melissa Balough': 'Senior Counsel',
-            'Melissa Clarke': 'Senior Counsel',
-            'Michael Keskey': 'Mid-Level Counsel',
-            'Michelle Maticic': 'Senior Counsel',
-            'Natasha Fedder': 'Senior Counsel',
-            'Nicole Baldocchi': 'Senior Counsel',
-            'Nora Wong': 'Mid-Level Counsel',
-            'Ornella Bourne': 'Mid-Level Counsel',
-            'Rainer Scarton': 'Mid-Level Counsel',
-            'Robert Gans': 'Senior Counsel',
-            'Robin Shofner': 'Senior Counsel',
-            'Robyn Marcello': 'Mid-Level Counsel',
-            'Sabina Schiller': 'Mid-Level Counsel',
-            'Samer Korkor': 'Senior Counsel',
-            'Sara Rau Frumkin': 'Senior Counsel',
-            'Scale LLP': 'Other',
-            'Scott Wiegand': 'Senior Counsel',
-            'Shailika Kotiya': 'Mid-Level Counsel',
-            'Shannon Straughan': 'Senior Counsel',
-            'Stephen Bosco': 'Mid-Level Counsel',
-            'Steve Forbes': 'Senior Counsel',
-            'Steve Zagami, Paralegal': 'Paralegal',
-            'Thomas Soave': 'Mid-Level Counsel',
-            'Thomas Stine': 'Senior Counsel',
-            'Tim Furin': 'Senior Counsel',
-            'Trey Calver': 'Senior Counsel',
-            'Tyler Hayden': 'Mid-Level Counsel',
-            'Whitney Joubert': 'Senior Counsel',
-            'Zach Ruby': 'Mid-Level Counsel'
-        }
+        if previous is None or previous['sha256'] != fingerprint['sha256']:
+            if previous is None or mode == 'full':
+                # Full rebuild: drop partitions that no manifest accounts for
+                shutil.rmtree(os.path.join(snapshot_dir, 'partitions'), ignore_errors=True)
+                partitions = _ingest_partitions(path, snapshot_dir, {})
+            elif previous.get('newline_terminated') and prefix_sha256 == previous['sha256']:
+                partitions = _ingest_append(path, snapshot_dir, manifest)
+            else:
+                partitions = _ingest_partitions(path, snapshot_dir, manifest['partitions'])
+            manifest = {
+                'pipeline_version': PIPELINE_VERSION,
+                'source': fingerprint,
+                'partitions': partitions
+            }
+            _write_json(manifest_path, manifest)
+        elif previous != fingerprint:
+            # Touched but unchanged: just record the new mtime
+            manifest['source'] = fingerprint
+            _write_json(manifest_path, manifest)
         
-        # Clean attorney names and add level
-        df['User full name (first, last)'] = df['User full name (first, last)'].str.strip()
-        df['Attorney level'] = df['User full name (first, last)'].map(attorney_levels).fillna('Unknown')
+        keys = sorted(manifest['partitions'], key=int)
+        dataset_version = f"{fingerprint['sha256'][:16]}-p{PIPELINE_VERSION}"
+        if history_months:
+            keys = [key for key in keys if int(key)][-history_months:]
+            dataset_version = f"{dataset_version}-{history_months}m"
         
-        # Add year column for filtering
-        df['year'] = df['Activity date'].dt.year
+        df = _read_partitions(snapshot_dir, keys)
+    if compact:
+        df = apply_compact_schema(df)
+    df.attrs['dataset_version'] = dataset_version
+    return df
+
+def load_exports(paths=DATA_FILES, snapshot_dir=SNAPSHOT_DIR, mode=INGEST_MODE, history_months=HISTORY_MONTHS):
+    """Load several exports into one dataset, each kept in its own incremental snapshot, and scan its quality."""
+    if len(paths) == 1:
+        df = load_snapshot(paths[0], snapshot_dir, mode, history_months)
+    else:
+        frames = []
+        for path in paths:
+            source_id = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]
+            source_dir = os.path.join(snapshot_dir, 'sources', f"{os.path.basename(path)}-{source_id}")
+            frames.append(load_snapshot(path, source_dir, mode, history_months, compact=False))
         
-        # Add missing information if not present
-        if 'Activity quarter' not in df.columns:
-            df['Activity quarter'] = df['Activity date'].dt.quarter.apply(lambda x: f'Q{x}')
-        if 'Activity month' not in df.columns:
-            df['Activity month'] = df['Activity date'].dt.month_name()
+        df = apply_compact_schema(pd.concat(frames, ignore_index=True))
+        df.attrs['dataset_version'] = hashlib.sha256(
+            '|'.join(frame.attrs['dataset_version'] for frame in frames).encode()
+        ).hexdigest()[:16]
+    
+    # Duplicates and outlier days span exports and partitions, so the scan runs on the combined dataset
+    df['Data quality flags'] = scan_data_quality(df)
+    return df
+
+@instrumented('data_quality')
+def scan_data_quality(df):
+    """Return each entry's QUALITY_CHECKS bitmask (0 = no findings).
+
+    Every check is a whole-column operation: duplicates hash the
+    DUPLICATE_KEY_COLUMNS, rate mismatches compare value with hours x User
+    rate, and outlier days come from z-scores of the daily tracked hours
+    grouped per attorney with bincounts.
+    """
+    flags = np.zeros(len(df), dtype=np.uint8)
+    dates = df['Activity date'].to_numpy('datetime64[D]')
+    dated = ~np.isnat(dates)
+    flags[~dated] |= QUALITY_CHECKS['Missing date']
+    
+    names = df['User full name (first, last)']
+    unmapped = (df['Attorney level'] == 'Unknown').to_numpy(bool) | names.isna().to_numpy()
+    flags[unmapped] |= QUALITY_CHECKS['Unmapped attorney']
+    
+    duplicated = df.duplicated(subset=DUPLICATE_KEY_COLUMNS, keep=False).to_numpy()
+    flags[duplicated & dated] |= QUALITY_CHECKS['Duplicate entry']
+    
+    hours = df['Billed & Unbilled hours'].fillna(0).to_numpy('float64')
+    value = df['Billed & Unbilled hours value'].fillna(0).to_numpy('float64')
+    expected = hours * df['User rate'].fillna(0).to_numpy('float64')
+    hourly = (df['Matter billing method'] == 'Hourly').to_numpy(bool)
+    mismatch = hourly & (expected > 0) & (np.abs(value - expected) > RATE_MISMATCH_TOLERANCE * expected)
+    flags[mismatch] |= QUALITY_CHECKS['Rate mismatch']
+    
+    # Daily tracked hours per (attorney, day), then each day's z-score within its attorney
+    codes = pd.factorize(names)[0]
+    rows = np.flatnonzero(dated & (codes >= 0))
+    if len(rows):
+        days = dates[rows].astype('int64')
+        span = days.max() - days.min() + 1
+        day_keys, day_of_row = np.unique(codes[rows] * span + (days - days.min()), return_inverse=True)
+        day_hours = np.bincount(day_of_row, weights=df['Tracked hours'].fillna(0).to_numpy('float64')[rows])
+        day_attorney = day_keys // span
+        day_counts = np.bincount(day_attorney)
+        divisor = np.maximum(day_counts, 1)  # attorneys whose entries are all undated have no days
+        mean = np.bincount(day_attorney, weights=day_hours) / divisor
+        std = np.sqrt(np.maximum(np.bincount(day_attorney, weights=day_hours ** 2) / divisor - mean ** 2, 0))
+        spread = std[day_attorney]
+        z_scores = np.divide(day_hours - mean[day_attorney], spread, out=np.zeros_like(day_hours), where=spread > 0)
+        outlier_days = (day_counts[day_attorney] >= OUTLIER_MIN_DAYS) & (z_scores > OUTLIER_Z_SCORE)
+        flags[rows[outlier_days[day_of_row]]] |= QUALITY_CHECKS['Outlier day']
+    
+    logger.info("Data quality: %d of %d entries flagged", np.count_nonzero(flags), len(df))
+    return flags
+
+def code_dtype(n_values):
+    """Return the smallest signed integer type holding ``n_values`` codes and -1 for missing values."""
+    return np.min_scalar_type(-max(n_values, 1))
+
+def _write_columns(df, directory):
+    """Save every column of ``df`` as ``<i>.npy`` in ``directory`` and return the column names."""
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    categories = {}
+    for i, (name, values) in enumerate(df.items()):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            array, categories[name] = values.cat.codes.to_numpy(), values.cat.categories
+        elif values.dtype == object:
+            codes, uniques = pd.factorize(values)
+            array, categories[name] = codes.astype(code_dtype(len(uniques))), pd.Index(uniques)
+        else:
+            array = values.to_numpy()
+        np.save(os.path.join(directory, f"{i}.npy"), array, allow_pickle=False)
+        columns.append(name)
+    
+    with open(os.path.join(directory, 'categories.pkl'), 'wb') as f:
+        pickle.dump(categories, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return columns
+
+def _read_columns(directory, columns):
+    """Return the frame _write_columns saved in ``directory``, its columns memory-mapped read-only."""
+    with open(os.path.join(directory, 'categories.pkl'), 'rb') as f:
+        categories = pickle.load(f)
+    arrays = {}
+    for i, name in enumerate(columns):
+        array = np.load(os.path.join(directory, f"{i}.npy"), mmap_mode='r')
+        if name in categories:
+            array = pd.Categorical.from_codes(array, categories=categories[name])
+        arrays[name] = array
+    return pd.DataFrame(arrays, copy=False)
+
+def publish_columns(df, root=SHARED_COLUMNS_DIR):
+    """Publish a processed frame and its rollup cube as one .npy file per column and point CURRENT at it.
+
+    Categorical columns are stored as their codes, text columns are
+    dictionary-encoded the same way, and numbers and dates are stored as
+    they are, so every column can be memory-mapped. A version is written
+    to a temporary directory and renamed into place before the pointer moves.
+    """
+    version = df.attrs['dataset_version']
+    version_dir = os.path.join(root, version)
+    if not os.path.exists(os.path.join(version_dir, 'manifest.json')):
+        tmp_dir = f"{version_dir}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        columns = _write_columns(df, tmp_dir)
+        cube = build_rollup_cube(df)
+        cube_columns = _write_columns(cube, os.path.join(tmp_dir, 'cube'))
+        _write_json(os.path.join(tmp_dir, 'manifest.json'), {
+            'dataset_version': version,
+            'columns': columns,
+            'cube_columns': cube_columns,
+            'rows': len(df),
+            'published_at': datetime.now().isoformat(),
+            'memory_usage': df.attrs.get('memory_usage')
+        })
+        os.replace(tmp_dir, version_dir)
+        logger.info("Published dataset version %s (%d rows) to %s", version, len(df), version_dir)
+    
+    _write_json(os.path.join(root, 'CURRENT'), {'dataset_version': version})
+    
+    # Unlinking is safe for attached workers: their mappings outlive the files
+    versions = sorted(
+        (entry for entry in os.scandir(root) if entry.is_dir() and '.tmp' not in entry.name),
+        key=lambda entry: entry.stat().st_mtime_ns
+    )
+    for entry in versions[:-SHARED_VERSIONS_KEPT]:
+        if entry.name != version:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return version_dir
+
+@instrumented('attach_columns')
+def attach_columns(root=SHARED_COLUMNS_DIR):
+    """Return the currently published frame, its columns memory-mapped read-only (no copy is made)."""
+    with open(os.path.join(root, 'CURRENT')) as f:
+        version = json.load(f)['dataset_version']
+    version_dir = os.path.join(root, version)
+    with open(os.path.join(version_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    
+    df = _read_columns(version_dir, manifest['columns'])
+    df.attrs['dataset_version'] = manifest['dataset_version']
+    df.attrs['loaded_at'] = datetime.fromisoformat(manifest['published_at'])
+    df.attrs['shared_columns'] = version_dir
+    if manifest.get('memory_usage'):
+        df.attrs['memory_usage'] = manifest['memory_usage']
+    return df
+
+def warm_dataset(df):
+    """Build the shared indexes and rollups of a dataset before any session needs them."""
+    get_filter_metadata(df)
+    get_filter_index(df)
+    cube = get_rollup_cube(df)
+    get_filter_index(cube)
+    get_trend_rollups(cube)
+    get_forecast_models(df)
+    get_capacity_engine(df)
+    get_drilldown_index(df)
+    get_quality_findings(df)
+    get_search_index(df)
+    if QUERY_BACKEND == 'sqlite':
+        get_shared(df, 'sqlite_store', ensure_sqlite_store)
+
+class DatasetRefresher:
+    """Keeps the current dataset loaded and warm, reloading it off the request path.
+
+    A daemon thread checks the watched files' size and mtime every ``interval``
+    seconds (the exports, or the CURRENT pointer of published shared columns).
+    When they change, it reloads the dataset, builds the shared
+    structures of the new version and only then swaps the new frame in with
+    a single reference assignment, so readers see either the old or the new
+    dataset, never a partial one.
+    """
+    
+    def __init__(self, paths=DATA_FILES, interval=REFRESH_SECONDS, source=DATASET_SOURCE):
+        self.source = source
+        self.paths = [os.path.join(SHARED_COLUMNS_DIR, 'CURRENT')] if source == 'shared' else paths
+        self.interval = interval
+        self.refreshes = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._source_stats = self._stat_sources()
+        self._dataset = self._load()
+        warm_dataset(self._dataset)
         
+        if interval > 0:
+            self._thread = threading.Thread(target=self._run, name='dataset-refresher', daemon=True)
+            self._thread.refresher = self
+            self._thread.start()
+    
+    def _stat_sources(self):
+        stats = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                stats[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                stats[path] = None
+        return stats
+    
+    def _load(self):
+        if self.source == 'shared':
+            return attach_columns()
+        df = load_exports(self.paths)
+        df.attrs['loaded_at'] = datetime.now()
         return df
+    
+    def current(self):
+        """Return the latest fully built dataset."""
+        return self._dataset
+    
+    def refresh(self):
+        """Reload and swap in the dataset if the exports changed; return whether a new version was swapped in."""
+        with self._lock:
+            stats = self._stat_sources()
+            if stats == self._source_stats:
+                return False
+            
+            with stage('refresh') as record:
+                df = self._load()
+                record['rows_out'] = len(df)
+                if df.attrs.get('dataset_version') == self._dataset.attrs.get('dataset_version'):
+                    # Touched but unchanged
+                    self._source_stats = stats
+                    return False
+                warm_dataset(df)
+            
+            self._dataset = df
+            self._source_stats = stats
+            self.refreshes += 1
+            logger.info("Swapped in dataset version %s", df.attrs.get('dataset_version'))
+            return True
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the previous version; retry on the next check
+                logger.exception("Background refresh failed")
+                self.last_error = str(e)
+    
+    def stop(self):
+        """Stop the background checks."""
+        self._stop.set()
+
+def stop_dataset_refreshers(keep=None):
+    """Stop the background checks of every refresher running in this process except ``keep``.
+
+    The dashboard re-runs this module on every rerun and a cleared cache
+    entry drops its refresher, so running refreshers are found through
+    their threads rather than a module-level registry.
+    """
+    for thread in threading.enumerate():
+        refresher = getattr(thread, 'refresher', None)
+        if thread.name == 'dataset-refresher' and refresher is not None and refresher is not keep:
+            refresher.stop()
+
+@st.cache_resource
+def get_dataset_refresher():
+    """Return the process-wide dataset refresher, loading the first dataset on first use."""
+    mark_cache_miss()
+    refresher = DatasetRefresher()
+    stop_dataset_refreshers(keep=refresher)  # the refresher of a cleared cache entry would keep polling
+    return refresher
+
+def load_and_process_data():
+    """Return the latest processed time entries, kept fresh by the background refresher."""
+    try:
+        return get_dataset_refresher().current()
         
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
@@ -182,168 +1104,263 @@ def load_and_process_data():
         st.error(traceback.format_exc())
         return None
 
+def _store_selection(name):
+    """Copy a picker's value into the selection it edits (callbacks run before the rerun, so facets see it)."""
+    st.session_state[f'filter_{name}'] = st.session_state[f'picker_{name}']
+
+def selection_multiselect(label, name, options, format_func, **kwargs):
+    """Multiselect whose selection is held in ``filter_<name>`` rather than in the widget.
+
+    The widget's identity follows its option labels (which carry live
+    counts), so it is rebuilt whenever they change; the held selection is
+    handed to each new widget as its default, so nothing picked is lost.
+    """
+    state = st.session_state
+    selected = [value for value in state.get(f'filter_{name}', []) if value in options]
+    state[f'filter_{name}'] = st.multiselect(
+        label,
+        options=options,
+        default=selected,
+        format_func=format_func,
+        key=f'picker_{name}',
+        on_change=_store_selection,
+        args=(name,),
+        **kwargs
+    )
+    return state[f'filter_{name}']
+
+def faceted_multiselect(label, name, options, facets):
+    """Multiselect offering only the values that still occur under the other filters, with row counts."""
+    counts = facets[name]
+    selected = st.session_state.get(f'filter_{name}', [])
+    return selection_multiselect(
+        label,
+        name,
+        options=[value for value in options if counts.get(value, 0) > 0 or value in selected],
+        format_func=lambda value: f"{value} ({counts.get(value, 0):,})"
+    )
+
+def search_selection_filters(selections):
+    """Split the (filter name, value) matches picked in the search into the SEARCH_FILTERS value lists."""
+    return {name: [value for match, value in selections if match == name] for name in SEARCH_FILTERS}
+
+def search_multiselect(df, facets):
+    """Search box over matters, companies and clients whose picked matches feed the SEARCH_FILTERS.
+
+    Only the ranked matches of the current query (and the matches already
+    picked) are sent to the browser, each with its row count under the
+    other filters; matches with no rows left are not offered. Picks are
+    held across queries, so matches of several searches combine.
+    """
+    query = st.text_input(
+        "Search Matters and Clients",
+        placeholder="Matter number, description, company or client",
+        key='search_query'
+    )
+    selected = st.session_state.get('filter_search', [])
+    matches = get_search_index(df).search(query)
+    options = list(selected) + [
+        match for match in zip(matches['filter'], matches['value'])
+        if match not in selected and facets[match[0]].get(match[1], 0) > 0
+    ]
+    selections = selection_multiselect(
+        "Matches",
+        'search',
+        options=options,
+        format_func=lambda match: f"{SEARCH_FILTERS[match[0]]}: {match[1]} ({facets[match[0]].get(match[1], 0):,})",
+        placeholder="Pick matches to filter on" if query else "Type to search"
+    )
+    return search_selection_filters(selections)
+
+def date_bounds(meta):
+    """Return the date range the date filter spans (today when the data has no dates)."""
+    min_date, max_date = meta['date_bounds']
+    if pd.isna(min_date) or pd.isna(max_date):
+        min_date = datetime.now()
+        max_date = datetime.now()
+    return min_date, max_date
+
+def default_filters(df):
+    """Return the filter set of a fresh dashboard session, with the values its widgets produce."""
+    meta = get_filter_metadata(df)
+    domains = meta['domains']
+    min_date, max_date = date_bounds(meta)
+    user_rate_min, user_rate_max = meta['rate_bounds']
+    return {
+        'year': domains['year'][-1] if domains['year'] else None,
+        'quarter': domains['Activity quarter'][0] if domains['Activity quarter'] else None,
+        'date_range': (min_date.date(), max_date.date()),
+        'min_hours': 0.0,
+        'min_amount': 0.0,
+        'rate_range': (float(user_rate_min), float(user_rate_max)),
+        'min_client_hours': 0.0,
+        'exclude_quality': [],
+        **{name: [] for name in DIMENSION_FILTERS}
+    }
+
+@instrumented('sidebar_filters')
 def create_sidebar_filters(df):
     """Create comprehensive sidebar filters."""
     st.sidebar.header("Filters")
+    meta = get_filter_metadata(df)
+    domains = meta['domains']
+    
+    min_date, max_date = date_bounds(meta)
+    user_rate_min, user_rate_max = meta['rate_bounds']
+    
+    # Facet the multiselects on the selections held from the previous run
+    year_options = domains['year']
+    quarter_options = domains['Activity quarter']
+    state = st.session_state
+    current_filters = {
+        name: state.get(f'filter_{name}', value) for name, value in default_filters(df).items()
+    }
+    current_filters.update(search_selection_filters(state.get('filter_search', [])))
+    facets = get_filter_index(df).facet_counts(current_filters)
     
     # Create tabs for filter categories
-    filter_tabs = st.sidebar.tabs(["Time", "Attorneys", "Practice", "Matter", "Financial", "Clients"])
+    filter_tabs = st.sidebar.tabs(["Time", "Attorneys", "Practice", "Matter", "Financial", "Clients", "Quality"])
     
     with filter_tabs[0]:  # Time Filters
         st.subheader("Time Period")
         
         # Handle year selection
-        year_options = sorted(df['year'].unique())
         if len(year_options) > 0:
             selected_year = st.selectbox(
                 "Year",
                 options=year_options,
-                index=len(year_options) - 1
+                index=len(year_options) - 1,
+                key='filter_year'
             )
         else:
             selected_year = None
         
         selected_quarter = st.selectbox(
             "Quarter",
-            options=sorted(df['Activity quarter'].unique()),
-            index=0
+            options=quarter_options,
+            index=0,
+            key='filter_quarter'
         )
         
-        selected_months = st.multiselect(
-            "Months",
-            options=sorted(df['Activity month'].unique())
-        )
-        
-        try:
-            min_date = pd.to_datetime(df['Activity date']).min()
-            max_date = pd.to_datetime(df['Activity date']).max()
-        except:
-            min_date = datetime.now()
-            max_date = datetime.now()
+        selected_months = faceted_multiselect("Months", 'months', domains['Activity month'], facets)
         
         date_range = st.date_input(
             "Custom Date Range",
             value=(min_date, max_date),
             min_value=min_date,
-            max_value=max_date
+            max_value=max_date,
+            key='filter_date_range'
         )
 
     with filter_tabs[1]:  # Attorney Filters
         st.subheader("Attorney Information")
         
-        attorney_levels = sorted(df['Attorney level'].dropna().unique())
-        selected_attorney_levels = st.multiselect(
-            "Attorney Levels",
-            options=attorney_levels
+        selected_attorney_levels = faceted_multiselect(
+            "Attorney Levels", 'attorney_levels', domains['Attorney level'], facets
         )
         
-        attorney_options = sorted(df['User full name (first, last)'].unique())
+        attorney_options = domains['User full name (first, last)']
         if selected_attorney_levels:
-            attorney_options = sorted([
-                name for name in df['User full name (first, last)'].unique()
-                if df[df['User full name (first, last)'] == name]['Attorney level'].iloc[0] in selected_attorney_levels
-            ])
+            attorney_options = [
+                name for name in attorney_options
+                if meta['attorney_levels'].get(name) in selected_attorney_levels
+            ]
         
-        selected_attorneys = st.multiselect(
-            "Attorneys",
-            options=attorney_options
-        )
+        selected_attorneys = faceted_multiselect("Attorneys", 'attorneys', attorney_options, facets)
         
-        selected_originating = st.multiselect(
-            "Originating Attorneys",
-            options=sorted(df['Originating attorney'].dropna().unique())
+        selected_originating = faceted_multiselect(
+            "Originating Attorneys", 'originating_attorneys', domains['Originating attorney'], facets
         )
         
-        tracked_hours_max = df['Tracked hours'].fillna(0).max()
+        attorney_hours_max = meta['attorney_hours_max']
         min_hours = st.slider(
             "Minimum Billable Hours",
             min_value=0.0,
-            max_value=float(tracked_hours_max),
+            max_value=float(attorney_hours_max),
             value=0.0,
-            step=0.1
+            step=0.1,
+            help="Keep attorneys whose billable hours under the other filters reach this total",
+            key='filter_min_hours'
         )
 
     with filter_tabs[2]:  # Practice Filters
         st.subheader("Practice Areas")
-        selected_practice_areas = st.multiselect(
-            "Practice Areas",
-            options=sorted(df['Practice area'].dropna().unique())
+        selected_practice_areas = faceted_multiselect(
+            "Practice Areas", 'practice_areas', domains['Practice area'], facets
         )
         
-        selected_locations = st.multiselect(
-            "Matter Locations",
-            options=sorted(df['Matter location'].dropna().unique())
+        selected_locations = faceted_multiselect(
+            "Matter Locations", 'locations', domains['Matter location'], facets
         )
 
     with filter_tabs[3]:  # Matter Filters
         st.subheader("Matter Details")
-        selected_matter_status = st.multiselect(
-            "Matter Status",
-            options=sorted(df['Matter status'].dropna().unique())
+        selected_matter_status = faceted_multiselect(
+            "Matter Status", 'matter_status', domains['Matter status'], facets
         )
         
-        billable_matter = st.multiselect(
-            "Billable Matter",
-            options=sorted(df['Billable matter'].dropna().unique())
+        billable_matter = faceted_multiselect(
+            "Billable Matter", 'billable_matter', domains['Billable matter'], facets
         )
         
-        selected_billing_methods = st.multiselect(
-            "Matter Billing Method",
-            options=sorted(df['Matter billing method'].dropna().unique())
+        selected_billing_methods = faceted_multiselect(
+            "Matter Billing Method", 'billing_methods', domains['Matter billing method'], facets
         )
 
     with filter_tabs[4]:  # Financial Filters
         st.subheader("Financial Metrics")
         
-        billed_value_max = df['Billed & Unbilled hours value'].fillna(0).max()
+        billed_value_max = meta['billed_value_max']
         min_amount = st.number_input(
             "Minimum Billable Amount",
             min_value=0.0,
             max_value=float(billed_value_max),
             value=0.0,
-            step=100.0
+            step=100.0,
+            key='filter_min_amount'
         )
         
-        user_rate_min = df['User rate'].fillna(0).min()
-        user_rate_max = df['User rate'].fillna(0).max()
         rate_range = st.slider(
             "Hourly Rate Range",
             min_value=float(user_rate_min),
             max_value=float(user_rate_max),
             value=(float(user_rate_min), float(user_rate_max)),
-            step=10.0
+            step=10.0,
+            key='filter_rate_range'
         )
 
     with filter_tabs[5]:  # Client Filters
         st.subheader("Client Information")
-        selected_companies = st.multiselect(
-            "Company Name",
-            options=sorted(df['Company name'].dropna().unique())
-        )
-        
-        selected_clients = st.multiselect(
-            "Client Name",
-            options=sorted(df['Contact full name (last, first)'].dropna().unique())
-        )
+        search_selections = search_multiselect(df, facets)
         
-        selected_matters = st.multiselect(
-            "Matter Description",
-            options=sorted(df['Matter description'].unique())
-        )
-        
-        client_hours_max = df.groupby('Matter description')['Tracked hours'].sum().fillna(0).max()
+        client_hours_max = meta['client_hours_max']
         min_client_hours = st.slider(
             "Minimum Client Hours",
             min_value=0.0,
             max_value=float(client_hours_max),
             value=0.0,
-            step=0.1
+            step=0.1,
+            help=f"Keep clients (by {meta['client_column'].lower()}) whose tracked hours under the other filters reach this total",
+            key='filter_min_client_hours'
+        )
+
+    with filter_tabs[6]:  # Data Quality Filters
+        st.subheader("Data Quality")
+        exclude_quality = faceted_multiselect(
+            "Exclude Flagged Entries", 'exclude_quality', list(QUALITY_CHECKS), facets
         )
 
     # Display refresh information
     st.sidebar.markdown("---")
-    st.sidebar.markdown("**Last Data Refresh:** " + datetime.now().strftime("%B %d, %Y"))
+    st.sidebar.markdown("**Last Data Refresh:** " + df.attrs.get('loaded_at', datetime.now()).strftime("%B %d, %Y %H:%M"))
     st.sidebar.markdown("**Data Range:** January 2024 - Present")
+    memory_usage = df.attrs.get('memory_usage')
+    if memory_usage:
+        st.sidebar.markdown(
+            f"**Data Memory:** {memory_usage['after'] / 1e6:,.1f} MB "
+            f"(was {memory_usage['before'] / 1e6:,.1f} MB)"
+            + (", memory-mapped and shared across workers" if df.attrs.get('shared_columns') else "")
+        )
 
     return {
         'year': selected_year,
@@ -361,96 +1378,391 @@ def create_sidebar_filters(df):
         'billing_methods': selected_billing_methods,
         'min_amount': min_amount,
         'rate_range': rate_range,
-        'companies': selected_companies,
-        'clients': selected_clients,
-        'matters': selected_matters,
-        'min_client_hours': min_client_hours
+        **search_selections,
+        'min_client_hours': min_client_hours,
+        'exclude_quality': exclude_quality
     }
     
-def filter_data(df, filters):
-    """Apply filters to the dataframe."""
-    try:
-        filtered_df = df.copy()
+# Derived structures kept per process (one per structure and dataset version)
+SHARED_CACHE_ENTRIES = 64
+
+@st.cache_resource(max_entries=SHARED_CACHE_ENTRIES)
+def _build_shared(_build, _df, name, dataset_version):
+    """Build a derived structure once per dataset version and share it across sessions."""
+    mark_cache_miss()
+    return _build(_df)
+
+# Structures built outside the dashboard (report workers, benchmark), where st.cache_resource does not memoize
+_local_shared = OrderedDict()
+
+def _build_local_shared(build, df, name, dataset_version):
+    """Build a derived structure once per dataset version in a process with no Streamlit runtime."""
+    key = (name, dataset_version)
+    if key in _local_shared:
+        _local_shared.move_to_end(key)
+        return _local_shared[key]
+    mark_cache_miss()
+    _local_shared[key] = build(df)
+    if len(_local_shared) > SHARED_CACHE_ENTRIES:
+        _local_shared.popitem(last=False)
+    return _local_shared[key]
+
+def get_shared(df, name, build):
+    """Return ``build(df)`` memoized per dataset version (unversioned frames are built directly)."""
+    dataset_version = df.attrs.get('dataset_version')
+    with stage(f"shared:{name}", len(df)) as record:
+        if dataset_version is None:
+            return build(df)
+        record['cache'] = 'hit'
+        if not runtime.exists():
+            return _build_local_shared(build, df, name, dataset_version)
+        return _build_shared(build, df, name, dataset_version)
+
+def build_filter_metadata(df):
+    """Collect the sorted option domains, numeric bounds and attorney levels the sidebar needs."""
+    attorneys = df.groupby('User full name (first, last)', observed=True)['Attorney level'].first()
+    columns = get_threshold_columns(df)
+    return {
+        'domains': {
+            col: sorted(df[col].dropna().unique())
+            for col in ['year', 'Activity quarter', 'Attorney level', 'User full name (first, last)']
+            + list(DIMENSION_FILTERS.values())
+        },
+        'date_bounds': (df['Activity date'].min(), df['Activity date'].max()),
+        'attorney_hours_max': round(float(
+            grouped_totals(df, 'User full name (first, last)', ['Billed & Unbilled hours'])['Billed & Unbilled hours'].max()
+        ), 1),
+        'billed_value_max': float(df['Billed & Unbilled hours value'].fillna(0).max()),
+        'rate_bounds': (float(df['User rate'].fillna(0).min()), float(df['User rate'].fillna(0).max())),
+        'client_column': columns['min_client_hours'],
+        'client_hours_max': round(float(
+            grouped_totals(df, columns['min_client_hours'], ['Tracked hours'])['Tracked hours'].max()
+        ), 1),
+        'attorney_levels': attorneys.dropna().to_dict()
+    }
+
+def threshold_columns(df):
+    """Map each GROUP_THRESHOLDS filter to the first of its grouping columns holding any value in ``df``."""
+    return {
+        name: next((column for column in columns if df[column].notna().any()), columns[0])
+        for name, (columns, _) in GROUP_THRESHOLDS.items()
+    }
+
+def get_threshold_columns(df):
+    """Return the shared threshold grouping columns of a loaded dataset."""
+    return get_shared(df, 'threshold_columns', threshold_columns)
+
+def get_filter_metadata(df):
+    """Return the shared sidebar metadata of a loaded dataset."""
+    return get_shared(df, 'filter_metadata', build_filter_metadata)
+
+class FilterIndex:
+    """Inverted index over the filterable columns of a frame.
+
+    Every dimension column maps each value to the row positions holding it
+    (one sorted run per value), and every range column keeps its non-null
+    values sorted alongside their row positions. Filters resolve to row
+    bitmaps that are ANDed together instead of slicing the frame repeatedly.
+    Group-total thresholds (GROUP_THRESHOLDS) resolve to the rows of the
+    groups whose measure, summed over the other filters, reaches them, and
+    excluded data-quality checks to the rows without those QUALITY_CHECKS bits.
+    """
+    
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self._postings = {}
+        self._codes = {}
+        self._sorted = {}
+        self._threshold_columns = threshold_columns(df)
+        # Row positions and codes are kept in the smallest integer types that hold them
+        positions = np.min_scalar_type(self.n_rows)
+        self._measures = {measure: df[measure].fillna(0).to_numpy() for _, measure in GROUP_THRESHOLDS.values()}
+        # Only raw entries carry quality flags (rollup cube rows mix flagged and clean entries)
+        self._quality = df['Data quality flags'].to_numpy() if 'Data quality flags' in df.columns else None
         
-        # Time filters
+        for column in INDEXED_DIMENSIONS:
+            codes, uniques = pd.factorize(df[column])
+            codes = codes.astype(code_dtype(len(uniques)))
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            offsets = np.concatenate([[0], np.cumsum(counts)]).astype(positions)
+            rows = order[np.count_nonzero(codes < 0):].astype(positions)
+            self._postings[column] = (pd.Index(uniques), offsets, rows)
+            self._codes[column] = codes
+        
+        for column in INDEXED_RANGES:
+            values = df[column].to_numpy()
+            rows = np.flatnonzero(~pd.isna(values))
+            order = rows[np.argsort(values[rows], kind='stable')]
+            self._sorted[column] = (values[order], order.astype(positions))
+    
+    def bitmap(self, column, values):
+        """Return the row bitmap of rows whose ``column`` is one of ``values``."""
+        uniques, offsets, rows = self._postings[column]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for code in uniques.get_indexer(list(values)):
+            if code >= 0:
+                mask[rows[offsets[code]:offsets[code + 1]]] = True
+        return mask
+    
+    def range_bitmap(self, column, low=None, high=None):
+        """Return the row bitmap of rows whose ``column`` lies within [low, high]."""
+        sorted_values, order = self._sorted[column]
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+        stop = len(order) if high is None else np.searchsorted(sorted_values, high, side='right')
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+    
+    def filter_bitmaps(self, filters):
+        """Return the row bitmap of every active filter, keyed by filter name."""
+        bitmaps = {}
         if filters['year']:
-            filtered_df = filtered_df[filtered_df['year'] == filters['year']]
+            bitmaps['year'] = self.bitmap('year', [filters['year']])
         if filters['quarter']:
-            filtered_df = filtered_df[filtered_df['Activity quarter'] == filters['quarter']]
-        if filters['months']:
-            filtered_df = filtered_df[filtered_df['Activity month'].isin(filters['months'])]
+            bitmaps['quarter'] = self.bitmap('Activity quarter', [filters['quarter']])
         if len(filters['date_range']) == 2:
-            filtered_df = filtered_df[
-                (filtered_df['Activity date'].dt.date >= filters['date_range'][0]) &
-                (filtered_df['Activity date'].dt.date <= filters['date_range'][1])
-            ]
+            start, end = filters['date_range']
+            bitmaps['date_range'] = self.range_bitmap(
+                'Activity date',
+                np.datetime64(start, 'ns'),
+                np.datetime64(end, 'ns') + np.timedelta64(1, 'D') - np.timedelta64(1, 'ns')
+            )
+        
+        for name, column in DIMENSION_FILTERS.items():
+            if filters[name]:
+                bitmaps[name] = self.bitmap(column, filters[name])
         
-        # Attorney filters
-        if filters['attorney_levels']:
-            filtered_df = filtered_df[filtered_df['Attorney level'].isin(filters['attorney_levels'])]
-        if filters['attorneys']:
-            filtered_df = filtered_df[filtered_df['User full name (first, last)'].isin(filters['attorneys'])]
-        if filters['originating_attorneys']:
-            filtered_df = filtered_df[filtered_df['Originating attorney'].isin(filters['originating_attorneys'])]
-        
-        # Practice area filters
-        if filters['practice_areas']:
-            filtered_df = filtered_df[filtered_df['Practice area'].isin(filters['practice_areas'])]
-        if filters['locations']:
-            filtered_df = filtered_df[filtered_df['Matter location'].isin(filters['locations'])]
-        
-        # Matter filters
-        if filters['matter_status']:
-            filtered_df = filtered_df[filtered_df['Matter status'].isin(filters['matter_status'])]
-        if filters['billable_matter']:
-            filtered_df = filtered_df[filtered_df['Billable matter'].isin(filters['billable_matter'])]
-        if filters['billing_methods']:
-            filtered_df = filtered_df[filtered_df['Matter billing method'].isin(filters['billing_methods'])]
-        
-        # Financial filters
         if filters['min_amount'] > 0:
-            filtered_df = filtered_df[filtered_df['Billed & Unbilled hours value'] >= filters['min_amount']]
+            bitmaps['min_amount'] = self.range_bitmap('Billed & Unbilled hours value', low=filters['min_amount'])
         if len(filters['rate_range']) == 2:
-            filtered_df = filtered_df[
-                (filtered_df['User rate'] >= filters['rate_range'][0]) &
-                (filtered_df['User rate'] <= filters['rate_range'][1])
-            ]
+            bitmaps['rate_range'] = self.range_bitmap('User rate', *filters['rate_range'])
+        if filters.get('exclude_quality') and self._quality is not None:
+            bitmaps['exclude_quality'] = (self._quality & quality_bits(filters['exclude_quality'])) == 0
         
-        # Client filters
-        if filters['companies']:
-            filtered_df = filtered_df[filtered_df['Company name'].isin(filters['companies'])]
-        if filters['clients']:
-            filtered_df = filtered_df[filtered_df['Contact full name (last, first)'].isin(filters['clients'])]
-        if filters['matters']:
-            filtered_df = filtered_df[filtered_df['Matter description'].isin(filters['matters'])]
+        thresholds = {name: filters.get(name) or 0 for name in GROUP_THRESHOLDS}
+        if any(value > 0 for value in thresholds.values()):
+            base = np.ones(self.n_rows, dtype=bool)
+            for bitmap in bitmaps.values():
+                base &= bitmap
+            for name, value in thresholds.items():
+                if value > 0:
+                    bitmaps[name] = self.group_threshold_bitmap(name, value, base)
+        return bitmaps
+    
+    def group_threshold_bitmap(self, name, threshold, base):
+        """Return the rows of the groups whose measure, summed over the ``base`` rows, reaches ``threshold``."""
+        column, measure = self._threshold_columns[name], GROUP_THRESHOLDS[name][1]
+        codes = self._codes[column]
+        selected = base & (codes >= 0)
+        totals = np.bincount(
+            codes[selected], weights=self._measures[measure][selected], minlength=len(self._postings[column][0])
+        )
+        passing = np.append(totals >= threshold - GROUP_THRESHOLD_TOLERANCE, False)  # code -1 (missing) never passes
+        return passing[codes]
+    
+    def facet_counts(self, filters):
+        """Return, for every multiselect filter, the row count of each value under the other active filters.
+
+        The mask excluding each filter comes from running prefix and suffix
+        ANDs over the active bitmaps, so all facets cost O(k) ANDs and one
+        bincount per dimension rather than one filtering pass per widget.
+        """
+        bitmaps = list(self.filter_bitmaps(filters).items())
+        prefix = [np.ones(self.n_rows, dtype=bool)]
+        for _, bitmap in bitmaps:
+            prefix.append(prefix[-1] & bitmap)
+        suffix = [np.ones(self.n_rows, dtype=bool)]
+        for _, bitmap in reversed(bitmaps):
+            suffix.append(suffix[-1] & bitmap)
+        suffix.reverse()
+        others = {name: prefix[i] & suffix[i + 1] for i, (name, _) in enumerate(bitmaps)}
         
-        if len(filtered_df) == 0:
-            st.warning("No data available for the selected filters. Please adjust your criteria.")
-            return df
-            
-        return filtered_df
+        facets = {}
+        for name, column in DIMENSION_FILTERS.items():
+            uniques = self._postings[column][0]
+            codes = self._codes[column][others.get(name, prefix[-1])]
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            facets[name] = dict(zip(uniques, counts.tolist()))
+        if self._quality is not None:
+            flags = self._quality[others.get('exclude_quality', prefix[-1])]
+            facets['exclude_quality'] = {
+                check: int(np.count_nonzero(flags & bit)) for check, bit in QUALITY_CHECKS.items()
+            }
+        return facets
+    
+    def group_codes(self, column):
+        """Return the values of an indexed column and each row's code into them (-1 = missing)."""
+        return self._postings[column][0], self._codes[column]
+    
+    def mask(self, filters):
+        """Return the combined row bitmap of all active filters."""
+        mask = np.ones(self.n_rows, dtype=bool)
+        for bitmap in self.filter_bitmaps(filters).values():
+            mask &= bitmap
+        return mask
+
+def quality_bits(checks):
+    """Return the QUALITY_CHECKS bitmask of the named checks."""
+    bits = 0
+    for check in checks:
+        bits |= QUALITY_CHECKS[check]
+    return bits
+
+def get_filter_index(df):
+    """Return the shared filter index of a loaded dataset."""
+    return get_shared(df, 'filter_index', FilterIndex)
+
+class SearchIndex:
+    """Inverted n-gram index over the distinct values of the SEARCH_FILTERS columns.
+
+    Every value is normalized to lowercase alphanumeric tokens and posted
+    under the 1- and 2-character prefixes and the trigrams of its tokens.
+    A query term resolves to the values holding all of its trigrams (or its
+    prefix, for short terms), checked for the actual substring; matches rank
+    by how well the terms match (whole token, token prefix, substring) and
+    then by entry count.
+    """
+    
+    def __init__(self, df):
+        filters, values, entries = [], [], []
+        for name in SEARCH_FILTERS:
+            counts = df[DIMENSION_FILTERS[name]].value_counts(sort=False)
+            counts = counts[counts > 0]
+            filters.append(np.full(len(counts), name, dtype=object))
+            values.append(counts.index.to_numpy(dtype=object))
+            entries.append(counts.to_numpy())
+        self.filters = np.concatenate(filters)
+        self.values = np.concatenate(values)
+        self.entries = np.concatenate(entries)
+        # Tokens padded with spaces, so whole tokens and token prefixes are plain substring checks
+        texts = [f" {' '.join(self.tokens(value))} " for value in self.values]
+        self.texts = np.array(texts, dtype=str)
         
-    except Exception as e:
-        st.error(f"Error applying filters: {str(e)}")
+        postings = {}
+        for doc, text in enumerate(texts):
+            for gram in {gram for token in text.split() for gram in self.grams(token)}:
+                postings.setdefault(gram, []).append(doc)
+        self._postings = {gram: np.array(docs) for gram, docs in postings.items()}
+    
+    @staticmethod
+    def tokens(text):
+        """Return the lowercase alphanumeric tokens of a text."""
+        return re.findall(r'[0-9a-z]+', str(text).lower())
+    
+    @staticmethod
+    def grams(token):
+        """Return the index keys of a token: its 1- and 2-character prefixes and its trigrams."""
+        return ['^' + token[:1], '^' + token[:2]] + [token[i:i + 3] for i in range(len(token) - 2)]
+    
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        """Return the best ``limit`` matches of a query, as filter name, value, entry count and score."""
+        terms = self.tokens(query)
+        docs = np.arange(len(self.values)) if terms else np.array([], dtype=int)
+        empty = np.array([], dtype=int)
+        for term in terms:
+            keys = ['^' + term] if len(term) < 3 else [term[i:i + 3] for i in range(len(term) - 2)]
+            for key in keys:
+                docs = np.intersect1d(docs, self._postings.get(key, empty), assume_unique=True)
+            if len(term) >= 3:
+                docs = docs[np.char.find(self.texts[docs], term) >= 0]
+        
+        texts = self.texts[docs]
+        scores = np.zeros(len(docs))
+        for term in terms:
+            scores += 1 + (np.char.find(texts, f" {term}") >= 0) + (np.char.find(texts, f" {term} ") >= 0)
+        order = np.lexsort((-self.entries[docs], -scores))[:limit]
+        docs = docs[order]
+        return pd.DataFrame({
+            'filter': self.filters[docs],
+            'value': self.values[docs],
+            'entries': self.entries[docs],
+            'score': scores[order]
+        })
+
+def get_search_index(df):
+    """Return the shared search index of a loaded dataset."""
+    return get_shared(df, 'search_index', SearchIndex)
+
+def filter_positions(df, filters):
+    """Return the row positions matching the filters, or None when every row matches."""
+    mask = get_filter_index(df).mask(filters)
+    if mask.all():
+        return None
+    return np.flatnonzero(mask)
+
+@instrumented('build_rollup_cube')
+def build_rollup_cube(df):
+    """Pre-aggregate the additive measures at day x filter-dimension grain.
+
+    Besides the hour and value sums, each cube row carries the hours and
+    value of its billable entries (for the average rate) and its entry count.
+    """
+    billable = df['Billed & Unbilled hours'] > 0
+    measures = df[ADDITIVE_MEASURES].astype('float64').assign(**{
+        'Billable entry hours': df['Billed & Unbilled hours'].where(billable, 0).astype('float64'),
+        'Billable entry value': df['Billed & Unbilled hours value'].where(billable, 0).astype('float64'),
+        'Entries': 1
+    })
+    cube = measures.groupby(
+        [df[col] for col in CUBE_DIMENSIONS], observed=True, dropna=False, sort=False
+    ).sum().reset_index()
+    if 'dataset_version' in df.attrs:
+        cube.attrs['dataset_version'] = f"{df.attrs['dataset_version']}:cube"
+    logger.info("Rollup cube: %d entries -> %d rows", len(df), len(cube))
+    return cube
+
+def load_rollup_cube(df):
+    """Attach the rollup cube published with a shared frame, or build it when there is none."""
+    version_dir = df.attrs.get('shared_columns')
+    if not version_dir or not os.path.exists(os.path.join(version_dir, 'cube', 'categories.pkl')):
+        return build_rollup_cube(df)
+    with open(os.path.join(version_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    cube = _read_columns(os.path.join(version_dir, 'cube'), manifest['cube_columns'])
+    cube.attrs['dataset_version'] = f"{df.attrs['dataset_version']}:cube"
+    return cube
+
+def get_rollup_cube(df):
+    """Return the shared rollup cube of a loaded dataset."""
+    return get_shared(df, 'rollup_cube', load_rollup_cube)
+
+def select_source(df, filters):
+    """Return the rollup cube, or the raw entries when a filter applies to individual entries."""
+    if filters['min_amount'] > 0 or filters.get('exclude_quality'):
+        # The minimum amount and quality exclusions apply to individual entries, not to cube cells
         return df
+    return get_rollup_cube(df)
 
+@instrumented('calculate_metrics')
 def calculate_metrics(df):
     """Calculate key performance metrics."""
     try:
         metrics = {
-            'total_hours': df['Tracked hours'].sum(),
-            'billable_hours': df['Billed & Unbilled hours'].sum(),
-            'billed_hours': df['Billed hours'].sum(),
-            'non_billable_hours': df['Non-billable hours'].sum(),
-            'total_revenue': df['Billed & Unbilled hours value'].sum(),
-            'billed_revenue': df['Billed hours value'].sum(),
-            'utilization_rate': (df['Billed & Unbilled hours'].sum() / df['Tracked hours'].sum() * 100) if df['Tracked hours'].sum() > 0 else 0
+            'total_hours': column_total(df, 'Tracked hours'),
+            'billable_hours': column_total(df, 'Billed & Unbilled hours'),
+            'billed_hours': column_total(df, 'Billed hours'),
+            'non_billable_hours': column_total(df, 'Non-billable hours'),
+            'total_revenue': column_total(df, 'Billed & Unbilled hours value'),
+            'billed_revenue': column_total(df, 'Billed hours value')
         }
+        metrics['utilization_rate'] = (
+            metrics['billable_hours'] / metrics['total_hours'] * 100 if metrics['total_hours'] > 0 else 0
+        )
         
         # Calculate average rate excluding zero hours
+        if 'Billable entry hours' in df.columns:
+            # Rollup cube rows carry the billable-entry totals pre-aggregated
+            billable_hours = column_total(df, 'Billable entry hours')
+            metrics['average_rate'] = column_total(df, 'Billable entry value') / billable_hours if billable_hours > 0 else 0
+            return metrics
+        
         billable_entries = df[df['Billed & Unbilled hours'] > 0]
         if len(billable_entries) > 0:
-            metrics['average_rate'] = billable_entries['Billed & Unbilled hours value'].sum() / billable_entries['Billed & Unbilled hours'].sum()
+            metrics['average_rate'] = (
+                column_total(billable_entries, 'Billed & Unbilled hours value')
+                / column_total(billable_entries, 'Billed & Unbilled hours')
+            )
         else:
             metrics['average_rate'] = 0
             
@@ -469,131 +1781,1522 @@ def calculate_metrics(df):
             'average_rate': 0
         }
 
-def display_metrics(metrics):
-    """Display key metrics in the dashboard."""
-    col1, col2, col3, col4 = st.columns(4)
+def build_comparison_arrays(df):
+    """Return each row's activity month and day offset (for moving dates by whole months), additive measures and entry count."""
+    dates = df['Activity date'].to_numpy('datetime64[D]')
+    months = dates.astype('datetime64[M]')
+    billable = df['Billed & Unbilled hours'].fillna(0).to_numpy('float64')
+    measures = {col: df[col].fillna(0).to_numpy('float64') for col in ADDITIVE_MEASURES}
+    if 'Billable entry hours' in df.columns:
+        measures['Billable entry hours'] = df['Billable entry hours'].to_numpy('float64')
+        measures['Billable entry value'] = df['Billable entry value'].to_numpy('float64')
+    else:
+        measures['Billable entry hours'] = np.where(billable > 0, billable, 0)
+        measures['Billable entry value'] = np.where(billable > 0, measures['Billed & Unbilled hours value'], 0)
+    # Cube rows carry the number of entries they total; a raw row is one entry
+    measures['Entries'] = df['Entries'].to_numpy('float64') if 'Entries' in df.columns else np.ones(len(df))
+    return {
+        'valid': ~np.isnat(dates),
+        'months': months,
+        'day_offsets': dates - months.astype('datetime64[D]'),
+        'measures': measures
+    }
+
+def comparison_shift(filters):
+    """Return how far before the selected window its prior window lies, as ``{'months': n}`` or ``{'days': n}``."""
+    months = sorted(int(month) for month in filters['months'] if str(month).isdigit())
+    if months:
+        return {'months': months[-1] - months[0] + 1}
+    if filters['quarter']:
+        return {'months': 3}
+    if filters['year']:
+        return {'months': 12}
+    if len(filters['date_range']) == 2:
+        start, end = filters['date_range']
+        return {'days': (pd.Timestamp(end) - pd.Timestamp(start)).days + 1}
+    return None
+
+def window_bitmap(arrays, filters, months=0, days=0):
+    """Return the rows whose activity date, moved forward by ``months`` and ``days``, lies in the filters' time window.
+
+    Moving by months keeps the day of the month, clipped to the target
+    month's length, the way calendar periods line up. The date range moves
+    with the window, so a period that is only partly loaded is compared with
+    the same part of the earlier period.
+    """
+    target = arrays['months'] + months
+    month_days = (target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')
+    shifted = target.astype('datetime64[D]') + np.minimum(arrays['day_offsets'], month_days - 1) + np.timedelta64(days, 'D')
+    month_number = shifted.astype('datetime64[M]').astype('int64') % 12 + 1
+    
+    mask = arrays['valid'].copy()
+    if filters['year']:
+        mask &= shifted.astype('datetime64[Y]').astype('int64') + 1970 == int(filters['year'])
+    if filters['quarter']:
+        quarter = str(filters['quarter'])
+        mask &= ((month_number - 1) // 3 + 1 == int(quarter)) if quarter.isdigit() else False
+    if filters['months']:
+        mask &= np.isin(month_number, [int(month) for month in filters['months'] if str(month).isdigit()])
+    if len(filters['date_range']) == 2:
+        start, end = (np.datetime64(day, 'D') for day in filters['date_range'])
+        mask &= (shifted >= start) & (shifted <= end)
+    return mask
+
+@instrumented('compare_periods')
+def compare_periods(df, filters):
+    """Return the metrics and per-attorney / per-practice totals of the selection, its prior window and a year earlier.
+
+    The non-time filters (and the group thresholds, as evaluated for the
+    current selection) resolve once. Rows are then tagged with every window
+    they fall in, and all totals come from one bincount over (window, group)
+    keys, so the three windows cost about as much as one query.
+    """
+    source = select_source(df, filters)
+    index = get_filter_index(source)
+    arrays = get_shared(source, 'comparison_arrays', build_comparison_arrays)
+    
+    others = np.ones(len(source), dtype=bool)
+    current = np.ones(len(source), dtype=bool)
+    for name, bitmap in index.filter_bitmaps(filters).items():
+        current &= bitmap
+        if name not in TIME_FILTERS:
+            others &= bitmap
+    
+    shift = comparison_shift(filters)
+    windows = [
+        current,
+        others & window_bitmap(arrays, filters, **shift) if shift else np.zeros(len(source), dtype=bool),
+        others & window_bitmap(arrays, filters, months=12)
+    ]
+    rows = [np.flatnonzero(window) for window in windows]
+    tags = np.repeat(np.arange(len(windows)), [len(window_rows) for window_rows in rows])
+    rows = np.concatenate(rows)
     
-    with col1:
-        st.metric(
+    totals = {
+        col: np.bincount(tags, weights=values[rows], minlength=len(windows))
+        for col, values in arrays['measures'].items()
+    }
+    comparison = {
+        'shift': shift,
+        'row_counts': dict(zip(COMPARISON_PERIODS, totals['Entries'].astype(int).tolist())),
+        'metrics': {
+            period: calculate_metrics(pd.DataFrame({col: values[[i]] for col, values in totals.items()}))
+            for i, period in enumerate(COMPARISON_PERIODS)
+        },
+        'breakdowns': {}
+    }
+    
+    for column in ['User full name (first, last)', 'Practice area']:
+        uniques, codes = index.group_codes(column)
+        row_codes = codes[rows]
+        known = row_codes >= 0
+        keys = tags[known] * len(uniques) + row_codes[known]
+        
+        def grouped(measure):
+            return np.bincount(
+                keys, weights=arrays['measures'][measure][rows][known], minlength=len(windows) * len(uniques)
+            ).reshape(len(windows), len(uniques))
+        
+        hours, value = grouped('Billed & Unbilled hours'), grouped('Billed & Unbilled hours value')
+        breakdown = pd.DataFrame({
+            column: np.asarray(uniques, dtype=object),
+            'Billable hours': hours[0],
+            'Prior billable hours': hours[1],
+            'Year-ago billable hours': hours[2],
+            'Value': value[0],
+            'Prior value': value[1],
+            'Year-ago value': value[2]
+        })
+        active = (hours != 0).any(axis=0) | (value != 0).any(axis=0)
+        comparison['breakdowns'][column] = (
+            breakdown[active].sort_values('Value', ascending=False).reset_index(drop=True)
+        )
+    return comparison
+
+def get_comparison(df, filters, result):
+    """Return the period comparison of a filtered result, computing it on first request."""
+    if 'comparison' not in result:
+        result['comparison'] = compare_periods(df, filters)
+    return result['comparison']
+
+def _change(current, baseline):
+    """Format the relative change from ``baseline`` to ``current``."""
+    if not baseline:
+        return "n/a"
+    return f"{(current - baseline) / abs(baseline) * 100:+.1f}%"
+
+def _percent(value):
+    """Format a percentage, or 'n/a' when it cannot be computed."""
+    return "n/a" if pd.isna(value) else f"{value:.1f}%"
+
+def display_projected_metrics(projection):
+    """Display the projected year-end billable hours and revenue next to their year-to-date actuals."""
+    hours, revenue = projection['billable_hours'], projection['total_revenue']
+    col1, col2 = st.columns(2)
+    col1.metric(
+        f"Projected {projection['year']} Billable Hours",
+        f"{hours['year_end']:,.1f}",
+        f"{hours['to_date']:,.1f} to date",
+        delta_color='off'
+    )
+    col2.metric(
+        f"Projected {projection['year']} Revenue",
+        f"${revenue['year_end']:,.2f}",
+        f"${revenue['to_date']:,.2f} to date",
+        delta_color='off'
+    )
+
+def display_metrics(metrics, baseline=None, baseline_label=None, projection=None):
+    """Display key metrics in the dashboard, with changes against ``baseline`` metrics when comparing periods.
+
+    With a ``projection``, the projected year-end totals are shown below the actuals.
+    """
+    if baseline is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(
             "Total Billable Hours",
             f"{metrics['billable_hours']:,.1f}",
-            f"${metrics['total_revenue']:,.2f}"
+            f"{_change(metrics['billable_hours'], baseline['billable_hours'])} vs {baseline_label}"
         )
-    
-    with col2:
-        st.metric(
-            "Billed Hours",
-            f"{metrics['billed_hours']:,.1f}",
-            f"${metrics['billed_revenue']:,.2f}"
+        col2.metric(
+            "Revenue",
+            f"${metrics['total_revenue']:,.2f}",
+            f"{_change(metrics['total_revenue'], baseline['total_revenue'])} vs {baseline_label}"
         )
-    
-    with col3:
-        st.metric(
+        col3.metric(
             "Utilization Rate",
             f"{metrics['utilization_rate']:.1f}%",
-            "of total hours"
+            f"{metrics['utilization_rate'] - baseline['utilization_rate']:+.1f} pts vs {baseline_label}"
         )
-    
-    with col4:
-        st.metric(
+        col4.metric(
             "Average Rate",
             f"${metrics['average_rate']:.2f}/hr",
-            "(billable hours)"
+            f"{_change(metrics['average_rate'], baseline['average_rate'])} vs {baseline_label}"
         )
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric(
+                "Total Billable Hours",
+                f"{metrics['billable_hours']:,.1f}",
+                f"${metrics['total_revenue']:,.2f}"
+            )
+        
+        with col2:
+            st.metric(
+                "Billed Hours",
+                f"{metrics['billed_hours']:,.1f}",
+                f"${metrics['billed_revenue']:,.2f}"
+            )
+        
+        with col3:
+            st.metric(
+                "Utilization Rate",
+                f"{metrics['utilization_rate']:.1f}%",
+                "of total hours"
+            )
+        
+        with col4:
+            st.metric(
+                "Average Rate",
+                f"${metrics['average_rate']:.2f}/hr",
+                "(billable hours)"
+            )
+    
+    if projection is not None:
+        display_projected_metrics(projection)
+
+def hours_distribution(df):
+    """Return the billable / non-billable / unbilled hours split."""
+    return pd.DataFrame({
+        'Category': ['Billable', 'Non-Billable', 'Unbilled'],
+        'Hours': [
+            column_total(df, 'Billed & Unbilled hours'),
+            column_total(df, 'Non-billable hours'),
+            column_total(df, 'Unbilled hours')
+        ]
+    })
 
-def create_visualizations(df):
-    """Create all visualizations for the dashboard."""
-    if df.empty:
-        st.warning("No data available to create visualizations.")
-        return None, None, None
+@instrumented('aggregate_chart_data')
+def aggregate_chart_data(df):
+    """Return the hours split, practice-area totals and attorney totals the charts are drawn from."""
+    hours_data = hours_distribution(df)
+    
+    practice_data = grouped_totals(df, 'Practice area', ['Billed & Unbilled hours', 'Billed & Unbilled hours value'])
+    
+    attorney_data = grouped_totals(df, 'User full name (first, last)', [
+        'Billed & Unbilled hours', 'Billed hours', 'Billed & Unbilled hours value', 'Tracked hours'
+    ])
+    
+    return hours_data, practice_data, attorney_data
+
+def build_hours_figure(hours_data, point_budget=None):
+    """Build the hours distribution pie (always three slices, so no budget applies)."""
+    return px.pie(
+        hours_data,
+        values='Hours',
+        names='Category',
+        title='Hours Distribution'
+    )
+
+def build_practice_figure(practice_data, point_budget=None):
+    """Build the practice area bars, folding the smallest areas into 'Other' beyond ``point_budget`` bars."""
+    title = 'Practice Area Performance'
+    if point_budget and len(practice_data) > point_budget:
+        ranked = practice_data.sort_values('Billed & Unbilled hours value', ascending=False)
+        kept, rest = ranked.iloc[:point_budget - 1], ranked.iloc[point_budget - 1:]
+        other = rest[['Billed & Unbilled hours', 'Billed & Unbilled hours value']].sum().to_frame().T
+        other['Practice area'] = f"Other ({len(rest)} areas)"
+        practice_data = pd.concat([kept, other], ignore_index=True)
+        title += f" (top {point_budget - 1} of {len(ranked)})"
+    
+    return px.bar(
+        practice_data,
+        x='Practice area',
+        y=['Billed & Unbilled hours', 'Billed & Unbilled hours value'],
+        title=title,
+        barmode='group'
+    )
+
+def build_attorney_figure(attorney_data, point_budget=None):
+    """Build the attorney scatter, keeping the ``point_budget`` attorneys with the most billable hours."""
+    utilization = (
+        attorney_data['Billed & Unbilled hours'] / attorney_data['Tracked hours'] * 100
+    ).fillna(0).replace([np.inf, -np.inf], 0)
+    
+    # Safe scatter plot: filter out NaN values and handle size carefully
+    attorney_data = attorney_data.assign(**{'Utilization Rate': utilization})
+    attorney_data = attorney_data[
+        attorney_data['Billed & Unbilled hours'].notna() & 
+        attorney_data['Billed & Unbilled hours value'].notna()
+    ]
+    
+    title = 'Attorney Performance'
+    if point_budget and len(attorney_data) > point_budget:
+        title += f" (top {point_budget} of {len(attorney_data)} by billable hours)"
+        attorney_data = attorney_data.nlargest(point_budget, 'Billed & Unbilled hours')
+    
+    # Normalize size for scatter plot
+    min_size = 5
+    max_size = 20
+    utilization = attorney_data['Utilization Rate']
+    spread = utilization.max() - utilization.min()
+    if spread > 0:
+        marker_size = (utilization - utilization.min()) / spread * (max_size - min_size) + min_size
+    else:
+        marker_size = pd.Series(max_size, index=attorney_data.index)
+    
+    return px.scatter(
+        attorney_data.assign(marker_size=marker_size),
+        x='Billed & Unbilled hours',
+        y='Billed & Unbilled hours value',
+        size='marker_size',
+        hover_name='User full name (first, last)',
+        title=title
+    )
+
+# Charts the user can open, with the chart data each one is drawn from
+CHARTS = {
+    'Hours Distribution': ('hours', build_hours_figure),
+    'Practice Areas': ('practice', build_practice_figure),
+    'Attorneys': ('attorney', build_attorney_figure)
+}
+
+def get_figure(result, chart, full_detail=False):
+    """Return one chart of a filtered result, building and serializing it only on first request."""
+    if result['chart_data'] is None:
+        return None
+    
+    key = (chart, full_detail)
+    with stage(f"figure:{chart}") as record:
+        record['cache'] = 'hit' if key in result['figures'] else 'miss'
+        if key not in result['figures']:
+            data_name, build = CHARTS[chart]
+            try:
+                with stage('build_figure', len(result['chart_data'][data_name])):
+                    fig = build(result['chart_data'][data_name], None if full_detail else CHART_POINT_BUDGET)
+            except Exception as e:
+                st.error(f"Error creating visualizations: {str(e)}")
+                return None
+            with stage('serialize_figure'):
+                result['figures'][key] = fig.to_json()
+        with stage('deserialize_figure'):
+            return pio.from_json(result['figures'][key])
+
+def dense_periods(dates, freq):
+    """Return each date's period number counted from the first period (-1 for missing dates) and the full period range."""
+    periods = pd.DatetimeIndex(dates).to_period(freq)
+    valid = ~periods.isna()
+    if not valid.any():
+        return np.full(len(periods), -1), pd.PeriodIndex([], freq=freq)
+    first, last = periods[valid].min(), periods[valid].max()
+    codes = np.where(valid, periods.asi8 - first.ordinal, -1)
+    return codes, pd.period_range(first, last, freq=freq)
+
+class TrendRollups:
+    """Period and breakdown codes of every row of a frame, for the trend panel.
+
+    Each grain maps rows to a dense period number (0 = first period of the
+    data) and each breakdown maps rows to a member code, so a trend is a
+    single weighted bincount into a periods x members matrix over the
+    filtered rows, with no groupby on dates per rerun.
+    """
+    
+    def __init__(self, df):
+        self.tracked = df['Tracked hours'].fillna(0).to_numpy('float64')
+        self.billable = df['Billed & Unbilled hours'].fillna(0).to_numpy('float64')
+        self.value = df['Billed & Unbilled hours value'].fillna(0).to_numpy('float64')
+        
+        self._periods = {}
+        for grain, freq in TREND_GRAINS.items():
+            codes, periods = dense_periods(df['Activity date'], freq)
+            self._periods[grain] = (codes, periods.to_timestamp())
+        
+        self._members = {}
+        for breakdown, column in TREND_BREAKDOWNS.items():
+            codes, uniques = pd.factorize(df[column])
+            self._members[breakdown] = (codes, pd.Index(uniques))
+    
+    def series(self, rows, grain, breakdown, measure, window=1, limit=TREND_SERIES_LIMIT):
+        """Return the long-format trend of ``measure`` per period and member over ``rows`` (None = all rows).
+
+        Hours and revenue are rolling means over ``window`` periods and
+        utilization is the ratio of the rolling billable and tracked sums;
+        all series are rolled at once from cumulative sums.
+        """
+        period_codes, labels = self._periods[grain]
+        member_codes, members = self._members[breakdown]
+        if rows is None:
+            rows = np.arange(len(period_codes))
+        rows = rows[(period_codes[rows] >= 0) & (member_codes[rows] >= 0)]
+        if len(rows) == 0:
+            return pd.DataFrame(columns=['Period', breakdown, measure])
+        
+        # Keep the members with the most billable hours in the selection
+        member = member_codes[rows]
+        totals = np.bincount(member, weights=self.billable[rows], minlength=len(members))
+        kept = np.argsort(-totals, kind='stable')[:min(limit, np.count_nonzero(np.bincount(member)))]
+        lookup = np.full(len(members), -1)
+        lookup[kept] = np.arange(len(kept))
+        rows = rows[lookup[member] >= 0]
+        member = lookup[member_codes[rows]]
+        
+        period = period_codes[rows]
+        first = period.min()
+        n_periods = period.max() - first + 1
+        cells = (period - first) * len(kept) + member
+        
+        def rolled(weights):
+            matrix = np.bincount(cells, weights=weights[rows], minlength=n_periods * len(kept))
+            sums = matrix.reshape(n_periods, len(kept)).cumsum(axis=0)
+            sums[window:] = sums[window:] - sums[:-window]
+            return sums
+        
+        if measure == 'Utilization':
+            tracked = rolled(self.tracked)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = np.where(tracked > 0, rolled(self.billable) / tracked * 100, np.nan)
+        else:
+            spans = np.minimum(np.arange(1, n_periods + 1), window)[:, None]
+            values = rolled(self.billable if measure == 'Hours' else self.value) / spans
+        
+        return pd.DataFrame({
+            'Period': np.repeat(labels[first:first + n_periods], len(kept)),
+            breakdown: np.tile(members[kept], n_periods),
+            measure: values.ravel()
+        })
+
+def get_trend_rollups(df):
+    """Return the shared trend rollups of a loaded dataset (or of its rollup cube)."""
+    return get_shared(df, 'trend_rollups', TrendRollups)
+
+@instrumented('trend_figure')
+def build_trend_figure(df, filters, result, grain, breakdown, measure, window=1):
+    """Build the trend line chart of a filtered result's rows at the chosen grain and breakdown."""
+    source = select_source(df, filters)
+    rows = result_rows(df, filters, result)
+    trend = get_trend_rollups(source).series(rows, grain, breakdown, measure, window)
+    if trend.empty:
+        return None
+    
+    title = f"{measure} by {breakdown.lower()} per {grain.lower()}"
+    if window > 1:
+        title += f" ({window}-{grain.lower()} rolling)"
+    fig = px.line(trend, x='Period', y=measure, color=breakdown, title=title)
+    if measure == 'Revenue':
+        fig.update_yaxes(tickprefix='$')
+    elif measure == 'Utilization':
+        fig.update_yaxes(ticksuffix='%')
+    return fig
+
+def display_trends(df, filters, result):
+    """Display the time-series trend panel."""
+    st.subheader("Trends")
+    grain_col, breakdown_col, measure_col, window_col = st.columns(4)
+    with grain_col:
+        grain = st.selectbox("Grain", options=list(TREND_GRAINS), index=2, key='trend_grain')
+    with breakdown_col:
+        breakdown = st.selectbox("Breakdown", options=list(TREND_BREAKDOWNS), key='trend_breakdown')
+    with measure_col:
+        measure = st.selectbox("Measure", options=TREND_MEASURES, key='trend_measure')
+    with window_col:
+        window = st.number_input(
+            "Rolling window (periods)", min_value=1, max_value=52, value=1, step=1, key='trend_window'
+        )
     
     try:
-        # Hours Distribution
-        hours_data = pd.DataFrame({
-            'Category': ['Billable', 'Non-Billable', 'Unbilled'],
-            'Hours': [
-                df['Billed & Unbilled hours'].sum(),
-                df['Non-billable hours'].sum(),
-                df['Unbilled hours'].sum()
-            ]
+        fig = build_trend_figure(df, filters, result, grain, breakdown, measure, int(window))
+    except Exception as e:
+        st.error(f"Error creating trend chart: {str(e)}")
+        return
+    if fig:
+        st.plotly_chart(fig, use_container_width=True)
+
+class ForecastModels:
+    """Trend and day-of-week models of the daily billable hours and revenue of the firm, every attorney and every practice area.
+
+    The daily rollups of all series form one days x series matrix per
+    measure and every model shares one design matrix (intercept, linear
+    trend, weekday dummies), so fitting all of them is a single batched
+    least-squares solve instead of a loop over series. Forecasts run from
+    the latest entry to the end of its year; the models being linear, the
+    forecast of a group of series is the sum of their forecasts.
+    """
+    
+    def __init__(self, df):
+        self.year = None
+        dates = df['Activity date'].to_numpy('datetime64[D]')
+        valid = ~np.isnat(dates)
+        if not valid.any():
+            return
+        
+        last = dates[valid].max()
+        year_start = last.astype('datetime64[Y]').astype('datetime64[D]')
+        year_end = (last.astype('datetime64[Y]') + 1).astype('datetime64[D]') - 1
+        fit_start = max(dates[valid].min(), last - FORECAST_HISTORY_DAYS + 1)
+        start = min(fit_start, year_start)
+        n_days = int((last - start).astype(int)) + 1
+        self.year = int(str(last)[:4])
+        self.last_date = last
+        self.dates = start + np.arange(n_days)
+        self.future_dates = last + 1 + np.arange(int((year_end - last).astype(int)))
+        self._year_offset = int((year_start - start).astype(int))
+        
+        # Series columns: the firm total, then every attorney, then every practice area
+        self._members, self._offsets = {}, {}
+        n_series = 1
+        series_codes = {}
+        for name, column in FORECAST_SERIES.items():
+            codes, uniques = pd.factorize(df[column])
+            self._members[name] = pd.Index(uniques)
+            self._offsets[name] = n_series
+            series_codes[name] = codes
+            n_series += len(uniques)
+        
+        rows = np.flatnonzero(valid & (dates >= start))
+        day = (dates[rows] - start).astype(int)
+        self.daily = {}
+        for metric, column in FORECAST_MEASURES.items():
+            weights = df[column].fillna(0).to_numpy('float64')[rows]
+            cells = [day * n_series]
+            cell_weights = [weights]
+            for name, codes in series_codes.items():
+                known = codes[rows] >= 0
+                cells.append(day[known] * n_series + self._offsets[name] + codes[rows][known])
+                cell_weights.append(weights[known])
+            self.daily[metric] = np.bincount(
+                np.concatenate(cells), weights=np.concatenate(cell_weights), minlength=n_days * n_series
+            ).reshape(n_days, n_series)
+        
+        fitted = np.arange(int((fit_start - start).astype(int)), n_days)
+        targets = np.hstack([self.daily[metric][fitted] for metric in FORECAST_MEASURES])
+        coefficients = np.linalg.lstsq(self.design(self.dates[fitted], fit_start), targets, rcond=None)[0]
+        forecasts = self.design(self.future_dates, fit_start) @ coefficients
+        self.forecast = dict(zip(FORECAST_MEASURES, np.hsplit(forecasts, len(FORECAST_MEASURES))))
+    
+    def design(self, dates, origin):
+        """Return the design matrix of the days ``dates``: intercept, trend in years since ``origin`` and Tuesday..Sunday dummies.
+
+        The fit and the forecast must share ``origin`` (the first fitted day)
+        for the trend coefficient to carry over.
+        """
+        days = dates.astype('datetime64[D]').astype('int64')
+        weekday = (days + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+        dummies = (weekday[:, None] == np.arange(1, 7)).astype('float64')
+        trend = (days - np.datetime64(origin, 'D').astype('int64')) / 365.25
+        return np.column_stack([np.ones(len(days)), trend, dummies])
+    
+    def columns(self, filters):
+        """Return the series columns a filter set projects (the selected attorneys, else practice areas, else the firm) and their label."""
+        for name in FORECAST_SERIES:
+            if filters.get(name):
+                codes = self._members[name].get_indexer(filters[name])
+                codes = codes[codes >= 0]
+                label = name.replace('_', ' ')
+                return self._offsets[name] + codes, f"{len(codes)} selected {label[:-1] if len(codes) == 1 else label}"
+        return np.array([0]), "the whole firm"
+    
+    def projection(self, filters):
+        """Return the year-to-date actuals, the daily forecast and the projected year-end totals of each FORECAST_MEASURES metric."""
+        columns, basis = self.columns(filters)
+        projection = {
+            'year': self.year,
+            'basis': basis,
+            'last_date': pd.Timestamp(self.last_date),
+            'dates': self.dates[self._year_offset:],
+            'future_dates': self.future_dates
+        }
+        for metric in FORECAST_MEASURES:
+            actual = self.daily[metric][self._year_offset:, columns].sum(axis=1)
+            forecast = np.maximum(self.forecast[metric][:, columns].sum(axis=1), 0)
+            projection[metric] = {
+                'actual_daily': actual,
+                'forecast_daily': forecast,
+                'to_date': float(actual.sum()),
+                'year_end': float(actual.sum() + forecast.sum())
+            }
+        return projection
+
+def get_forecast_models(df):
+    """Return the shared forecast models of a loaded dataset, fitted on its rollup cube."""
+    return get_shared(get_rollup_cube(df), 'forecast_models', ForecastModels)
+
+def get_projection(df, filters):
+    """Return the year-end projection of a filter set, or None when the data has no dates."""
+    models = get_forecast_models(df)
+    return models.projection(filters) if models.year else None
+
+def build_projection_figure(projection, metric):
+    """Build the cumulative actual vs. projected line chart of a projected metric."""
+    values = projection[metric]
+    actual = np.cumsum(values['actual_daily'])
+    forecast = actual[-1] + np.cumsum(values['forecast_daily']) if len(actual) else np.cumsum(values['forecast_daily'])
+    label = 'Billable hours' if metric == 'billable_hours' else 'Revenue'
+    fig = go.Figure([
+        go.Scatter(x=projection['dates'], y=actual, name='Actual', mode='lines'),
+        go.Scatter(
+            x=np.concatenate([projection['dates'][-1:], projection['future_dates']]),
+            y=np.concatenate([actual[-1:], forecast]),
+            name='Projected',
+            mode='lines',
+            line={'dash': 'dash'}
+        )
+    ])
+    fig.update_layout(title=f"Cumulative {label.lower()} in {projection['year']}, projected to year-end")
+    if metric == 'total_revenue':
+        fig.update_yaxes(tickprefix='$')
+    return fig
+
+def display_projection(projection):
+    """Display the year-end projection chart."""
+    with st.expander(f"{projection['year']} year-end projection"):
+        metric = st.radio(
+            "Projected measure",
+            options=['Billable hours', 'Revenue'],
+            horizontal=True,
+            key='projection_measure'
+        )
+        st.plotly_chart(
+            build_projection_figure(projection, 'billable_hours' if metric == 'Billable hours' else 'total_revenue'),
+            use_container_width=True
+        )
+        st.caption(
+            f"Projected for {projection['basis']} from entries through {projection['last_date']:%B %d, %Y} "
+            "with a trend and day-of-week model; other filters do not apply to the projection."
+        )
+
+class CapacityEngine:
+    """Per-attorney capacity, utilization and realization over any row selection.
+
+    Rows are coded by attorney and by dense period number for every capacity
+    grain once per dataset version; a selection is then rolled into
+    attorney x period matrices with one bincount per measure. Expected hours
+    prorate each attorney's ``User yearly working days`` by the business
+    days of the period, at CAPACITY_HOURS_PER_DAY hours a day; the period
+    still in progress only counts its business days through the latest
+    activity date.
+    """
+    
+    def __init__(self, df):
+        self._attorney_codes, attorneys = pd.factorize(df['User full name (first, last)'])
+        self.attorneys = pd.Index(attorneys)
+        working_days = df['User yearly working days'].to_numpy('float64')
+        self.working_days = (
+            pd.Series(working_days).groupby(self._attorney_codes).first()
+            .reindex(range(len(self.attorneys))).to_numpy()
+        )
+        
+        self.tracked = df['Tracked hours'].fillna(0).to_numpy('float64')
+        self.billable = df['Billed & Unbilled hours'].fillna(0).to_numpy('float64')
+        self.billed_hours = df['Billed hours'].fillna(0).to_numpy('float64')
+        self.billed_value = df['Billed hours value'].fillna(0).to_numpy('float64')
+        # Billed hours at each entry's standard rate, the realization baseline
+        self.standard_value = self.billed_hours * df['User rate'].fillna(0).to_numpy('float64')
+        
+        through = df['Activity date'].max()
+        self._periods = {}
+        for grain, freq in CAPACITY_GRAINS.items():
+            codes, periods = dense_periods(df['Activity date'], freq)
+            self._periods[grain] = (codes, periods, self._capacity_share(periods, through))
+    
+    @staticmethod
+    def _capacity_share(periods, through=None):
+        """Return the share of its year's business days that falls in each period, up to the day ``through``."""
+        if len(periods) == 0:
+            return np.array([])
+        def business_days(spans, end=None):
+            starts = spans.start_time.to_numpy().astype('datetime64[D]')
+            ends = spans.end_time.to_numpy().astype('datetime64[D]') + 1
+            if end is not None:
+                ends = np.clip(ends, starts, end)
+            return np.busday_count(starts, ends)
+        end = None if pd.isna(through) else np.datetime64(pd.Timestamp(through).date(), 'D') + 1
+        return business_days(periods, end) / business_days(periods.asfreq('Y'))
+    
+    def capacity(self, rows, grain='Month'):
+        """Return the capacity table of ``rows`` (None = all rows), one row per attorney and period.
+
+        Every attorney in the selection gets a row for every period the
+        selection spans, so months without entries still count against
+        capacity.
+        """
+        period_codes, periods, share = self._periods[grain]
+        if rows is None:
+            rows = np.arange(len(period_codes))
+        rows = rows[(period_codes[rows] >= 0) & (self._attorney_codes[rows] >= 0)]
+        if len(rows) == 0:
+            return pd.DataFrame()
+        
+        period = period_codes[rows]
+        first = period.min()
+        n_periods = period.max() - first + 1
+        kept = np.unique(self._attorney_codes[rows])
+        lookup = np.full(len(self.attorneys), -1)
+        lookup[kept] = np.arange(len(kept))
+        cells = lookup[self._attorney_codes[rows]] * n_periods + (period - first)
+        
+        def matrix(weights):
+            return np.bincount(cells, weights=weights[rows], minlength=len(kept) * n_periods)
+        
+        expected = (self.working_days[kept][:, None] * share[first:first + n_periods] * CAPACITY_HOURS_PER_DAY).ravel()
+        table = pd.DataFrame({
+            'Attorney': np.repeat(self.attorneys[kept], n_periods),
+            'Period': np.tile(periods[first:first + n_periods].astype(str), len(kept)),
+            'Yearly working days': np.repeat(self.working_days[kept], n_periods),
+            'Expected hours': expected,
+            'Tracked hours': matrix(self.tracked),
+            'Billable hours': matrix(self.billable),
+            'Billed hours': matrix(self.billed_hours),
+            'Standard value': matrix(self.standard_value),
+            'Billed value': matrix(self.billed_value)
+        })
+        return add_capacity_ratios(table)
+    
+    def summary(self, rows, grain='Month'):
+        """Return the capacity table of ``rows`` totalled per attorney over the selected periods."""
+        table = self.capacity(rows, grain)
+        if table.empty:
+            return table
+        totals = table.drop(columns=['Period']).groupby('Attorney', observed=True, sort=False).agg({
+            'Yearly working days': 'first',
+            **{col: 'sum' for col in CAPACITY_SUMS}
         })
+        return add_capacity_ratios(totals.reset_index())
+
+# Additive columns of a capacity table, from which its ratios are recomputed
+CAPACITY_SUMS = ['Expected hours', 'Tracked hours', 'Billable hours', 'Billed hours', 'Standard value', 'Billed value']
+
+def add_capacity_ratios(table):
+    """Add utilization, capacity utilization and realization percentages to a capacity table."""
+    def ratio(numerator, denominator):
+        return (table[numerator] / table[denominator].where(table[denominator] > 0) * 100)
+    return table.assign(**{
+        'Utilization %': ratio('Billable hours', 'Tracked hours'),
+        'Capacity utilization %': ratio('Billable hours', 'Expected hours'),
+        'Realization %': ratio('Billed value', 'Standard value')
+    })
+
+def get_capacity_engine(df):
+    """Return the shared capacity engine of a loaded dataset."""
+    return get_shared(df, 'capacity_engine', CapacityEngine)
+
+def display_capacity(df, filters, result):
+    """Display firm-wide and per-attorney capacity, utilization and realization for the filtered entries."""
+    st.subheader("Capacity & Realization")
+    grain = st.selectbox("Period", options=list(CAPACITY_GRAINS), key='capacity_grain')
+    
+    try:
+        with stage('capacity', len(df)) as record:
+            engine = get_capacity_engine(df)
+            rows = result_entry_rows(df, filters, result)
+            summary = engine.summary(rows, grain)
+            record['rows_out'] = len(summary)
+    except Exception as e:
+        st.error(f"Error calculating capacity: {str(e)}")
+        return
+    if summary.empty:
+        return
+    
+    firm = add_capacity_ratios(summary[CAPACITY_SUMS].sum().to_frame().T).iloc[0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Expected Hours", f"{firm['Expected hours']:,.1f}", f"{firm['Billable hours']:,.1f} billable")
+    col2.metric("Capacity Utilization", _percent(firm['Capacity utilization %']), "of expected hours")
+    col3.metric("Realization", _percent(firm['Realization %']), "billed value vs. standard rates")
+    
+    st.dataframe(
+        summary.sort_values('Billable hours', ascending=False),
+        use_container_width=True,
+        hide_index=True
+    )
+    with st.expander(f"By {grain.lower()}"):
+        st.dataframe(engine.capacity(rows, grain), use_container_width=True, hide_index=True)
+
+class DrilldownIndex:
+    """Client -> matter -> attorney hierarchy over the entries, for drilldowns by lookup.
+
+    Entries are sorted once by the DRILLDOWN_LEVELS codes, so every node of
+    the hierarchy is a contiguous run of the sort order and the children of a
+    node are the next level's runs inside it. Totals of a node's children
+    are a reduceat over just that run (with the filter mask as weights), and
+    the entries of a leaf are a slice of the order.
+    """
+    
+    def __init__(self, df):
+        codes, self._labels = [], []
+        for column in DRILLDOWN_LEVELS:
+            level_codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+            codes.append(level_codes)
+            self._labels.append(pd.Index(uniques))
+        self.order = np.lexsort(codes[::-1])
+        sorted_codes = [level_codes[self.order] for level_codes in codes]
+        
+        n_rows = len(df)
+        changed = np.zeros(n_rows, dtype=bool)
+        if n_rows:
+            changed[0] = True
+        self._starts, self._keys = [], []
+        for level_codes in sorted_codes:
+            changed[1:] |= level_codes[1:] != level_codes[:-1]
+            starts = np.flatnonzero(changed)
+            self._starts.append(starts)
+            self._keys.append(level_codes[starts])
+        self._ends = [np.append(starts[1:], n_rows) for starts in self._starts]
+        
+        self._weights = {
+            col: df[col].fillna(0).to_numpy('float64')[self.order]
+            for col in ['Tracked hours', 'Billed & Unbilled hours', 'Billed hours',
+                        'Billed & Unbilled hours value', 'Billed hours value']
+        }
+        matter_starts = self.order[self._starts[1]]
+        self._matter_details = {
+            col: df[col].to_numpy()[matter_starts] for col in ['Matter description', 'Matter billing method']
+        }
+    
+    def children(self, mask, level, parent=None):
+        """Return the totals of the nodes at ``level`` under node ``parent`` of the level above, over the ``mask`` rows.
+
+        ``mask`` is a row bitmap (None = all rows). Nodes are numbered per
+        level; the ``node`` column of the result identifies each one for
+        further drilling, and nodes with no selected entries are dropped.
+        """
+        starts = self._starts[level]
+        if parent is None:
+            first, last = 0, len(starts)
+        else:
+            first, last = np.searchsorted(starts, [self._starts[level - 1][parent], self._ends[level - 1][parent]])
+        if first == last:
+            return pd.DataFrame()
+        
+        lo, hi = starts[first], self._ends[level][last - 1]
+        selected = np.ones(hi - lo) if mask is None else mask[self.order[lo:hi]].astype('float64')
+        offsets = starts[first:last] - lo
+        entries = np.add.reduceat(selected, offsets)
+        totals = {col: np.add.reduceat(weights[lo:hi] * selected, offsets) for col, weights in self._weights.items()}
         
-        fig_hours = px.pie(
-            hours_data,
-            values='Hours',
-            names='Category',
-            title='Hours Distribution'
-        )
-        
-        # Practice Area Analysis
-        practice_data = df.groupby('Practice area').agg({
-            'Billed & Unbilled hours': 'sum',
-            'Billed & Unbilled hours value': 'sum'
-        }).reset_index()
-        
-        fig_practice = px.bar(
-            practice_data,
-            x='Practice area',
-            y=['Billed & Unbilled hours', 'Billed & Unbilled hours value'],
-            title='Practice Area Performance',
-            barmode='group'
-        )
-        
-        # Attorney Performance 
-        attorney_data = df.groupby('User full name (first, last)').agg({
-            'Billed & Unbilled hours': 'sum',
-            'Billed hours': 'sum',
-            'Billed & Unbilled hours value': 'sum',
-            'Tracked hours': 'sum'
-        }).reset_index()
-        
-        attorney_data['Utilization Rate'] = (
-            attorney_data['Billed & Unbilled hours'] / attorney_data['Tracked hours'] * 100
-        ).fillna(0).replace([np.inf, -np.inf], 0)
-        
-        # Safe scatter plot: filter out NaN values and handle size carefully
-        attorney_data_clean = attorney_data[
-            attorney_data['Billed & Unbilled hours'].notna() & 
-            attorney_data['Billed & Unbilled hours value'].notna() &
-            (attorney_data['Utilization Rate'].notna())
+        labels = self._labels[level][self._keys[level][first:last]]
+        nodes = pd.DataFrame({
+            'node': np.arange(first, last),
+            DRILLDOWN_LEVELS[level]: np.asarray(labels, dtype=object),
+            'Entries': entries.astype(int),
+            **totals
+        })
+        if level == 1:
+            for col, values in reversed(self._matter_details.items()):
+                nodes.insert(2, col, values[first:last])
+        billable = nodes['Billed & Unbilled hours']
+        nodes['Billed share %'] = nodes['Billed hours'] / billable.where(billable > 0) * 100
+        return nodes[nodes['Entries'] > 0].sort_values('Billed & Unbilled hours value', ascending=False)
+    
+    def entries(self, mask, node):
+        """Return the row positions of the selected entries of an attorney node."""
+        rows = self.order[self._starts[-1][node]:self._ends[-1][node]]
+        return rows if mask is None else rows[mask[rows]]
+
+def get_drilldown_index(df):
+    """Return the shared drilldown index of a loaded dataset."""
+    return get_shared(df, 'drilldown_index', DrilldownIndex)
+
+def drilldown_select(nodes, level, key):
+    """Pick one node of a drilldown table, returning its node number or None."""
+    column = DRILLDOWN_LEVELS[level]
+    # Labels are unique among the children of one node
+    nodes_by_label = dict(zip(nodes[column].fillna('(none)').astype(str), nodes['node']))
+    label = st.selectbox(
+        column,
+        options=list(nodes_by_label),
+        index=None,
+        placeholder=f"Drill into a {column.lower()}",
+        key=key
+    )
+    return None if label is None else nodes_by_label[label]
+
+def display_drilldown(df, filters, result):
+    """Display the client -> matter -> attorney -> entries drilldown of the filtered entries."""
+    st.subheader("Client Drilldown")
+    try:
+        with stage('drilldown', len(df)):
+            index = get_drilldown_index(df)
+            mask = result_entry_mask(df, filters, result)
+            nodes = index.children(mask, 0)
+    except Exception as e:
+        st.error(f"Error building drilldown: {str(e)}")
+        return
+    if nodes.empty:
+        return
+    
+    # Each level is a lookup into the index under the node picked above it
+    parent = None
+    for level, name in enumerate(['client', 'matter', 'attorney']):
+        st.dataframe(nodes.drop(columns=['node']).round(2), use_container_width=True, hide_index=True)
+        parent = drilldown_select(nodes, level, key=f'drilldown_{name}_{parent}')
+        if parent is None:
+            return
+        if level < len(DRILLDOWN_LEVELS) - 1:
+            nodes = index.children(mask, level + 1, parent)
+    
+    st.dataframe(
+        df.take(index.entries(mask, parent))[DRILLDOWN_ENTRY_COLUMNS],
+        use_container_width=True,
+        hide_index=True
+    )
+
+def build_quality_findings(df):
+    """Return the side table of data-quality findings: one row per flagged entry and failed check.
+
+    ``Row`` is the entry's position in the dataset, so the table filters
+    with the dashboard's row bitmaps. Details are derived from the flagged
+    entries alone (a duplicate's copies and an outlier day's entries are
+    all flagged), keeping the table cheap however large the dataset.
+    """
+    flags = df['Data quality flags'].to_numpy()
+    findings = []
+    for check, bit in QUALITY_CHECKS.items():
+        rows = np.flatnonzero(flags & bit)
+        entries = df.take(rows)
+        if check == 'Duplicate entry':
+            copies = entries.groupby(DUPLICATE_KEY_COLUMNS, observed=True, dropna=False)['Tracked hours'].transform('size')
+            detail = np.char.mod('%d identical entries', copies.to_numpy())
+        elif check == 'Rate mismatch':
+            expected = entries['Billed & Unbilled hours'].to_numpy('float64') * entries['User rate'].to_numpy('float64')
+            share = entries['Billed & Unbilled hours value'].to_numpy('float64') / expected * 100
+            detail = np.char.mod('value is %.0f%% of hours x rate', share)
+        elif check == 'Outlier day':
+            day_hours = entries['Tracked hours'].astype('float64').groupby(
+                [entries['User full name (first, last)'], entries['Activity date']], observed=True
+            ).transform('sum')
+            detail = np.char.mod('%.1f hours tracked that day', day_hours.to_numpy('float64'))
+        elif check == 'Unmapped attorney':
+            detail = 'no attorney level on record'
+        else:
+            detail = 'activity date missing or unreadable'
+        findings.append(pd.DataFrame({
+            'Row': rows,
+            'Check': check,
+            'Activity date': entries['Activity date'].to_numpy(),
+            'Attorney': entries['User full name (first, last)'].to_numpy(),
+            'Matter number': entries['Matter number'].to_numpy(),
+            'Tracked hours': entries['Tracked hours'].to_numpy(),
+            'Billed & Unbilled hours value': entries['Billed & Unbilled hours value'].to_numpy(),
+            'User rate': entries['User rate'].to_numpy(),
+            'Detail': detail
+        }))
+    
+    table = pd.concat(findings, ignore_index=True)
+    table['Check'] = pd.Categorical(table['Check'], categories=list(QUALITY_CHECKS))
+    return table
+
+def get_quality_findings(df):
+    """Return the shared data-quality findings of a loaded dataset."""
+    return get_shared(df, 'quality_findings', build_quality_findings)
+
+def display_data_quality(df, filters, result):
+    """Display the data-quality findings among the filtered entries, with a count per check."""
+    st.subheader("Data Quality")
+    try:
+        with stage('data_quality_findings', len(df)) as record:
+            findings = get_quality_findings(df)
+            mask = result_entry_mask(df, filters, result)
+            if mask is not None:
+                findings = findings[mask[findings['Row'].to_numpy()]]
+            record['rows_out'] = len(findings)
+    except Exception as e:
+        st.error(f"Error loading data-quality findings: {str(e)}")
+        return
+    
+    counts = findings['Check'].value_counts(sort=False)
+    for col, (check, count) in zip(st.columns(len(QUALITY_CHECKS)), counts.items()):
+        col.metric(check, f"{count:,}")
+    if findings.empty:
+        st.caption("No data-quality findings among the selected entries.")
+        return
+    
+    with st.expander(f"Flagged entries ({findings['Row'].nunique():,})"):
+        checks = st.multiselect(
+            "Checks", options=list(QUALITY_CHECKS), placeholder="All checks", key='quality_checks'
+        )
+        if checks:
+            findings = findings[findings['Check'].isin(checks)]
+        st.dataframe(findings.drop(columns=['Row']), use_container_width=True, hide_index=True)
+
+def _sql_name(column):
+    """Quote a column name for SQL."""
+    return '"' + column.replace('"', '""') + '"'
+
+def build_sqlite_store(df, path):
+    """Write the processed entries to a SQLite file that every worker process can query."""
+    entries = pd.DataFrame(index=df.index)
+    for col in dict.fromkeys(SQL_COLUMNS):
+        values = df[col]
+        if col == 'Activity date':
+            values = values.dt.strftime('%Y-%m-%d')
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        elif values.dtype == np.float32:
+            # Store the decimal the float32 stands for, not its binary expansion
+            values = values.astype(np.float64).round(6)
+        entries[col] = values
+    
+    def write(tmp_path):
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            entries.to_sql('entries', conn, index=False, chunksize=50_000)
+            for number, col in enumerate(SQL_INDEXED_COLUMNS):
+                conn.execute(f'CREATE INDEX entries_{number} ON entries ({_sql_name(col)})')
+            conn.commit()
+    _write_atomic(path, write)
+
+def ensure_sqlite_store(df):
+    """Return the path of the dataset's SQLite store, building it if no worker has yet.
+
+    Stores of the previous SHARED_VERSIONS_KEPT versions are kept for the
+    sessions still pinned to them.
+    """
+    path = os.path.join(SNAPSHOT_DIR, f"entries-{df.attrs.get('dataset_version', 'unversioned')}.sqlite")
+    if not os.path.isfile(path):
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        build_sqlite_store(df, path)
+        _prune_versions(glob.glob(os.path.join(SNAPSHOT_DIR, 'entries-*.sqlite')), path)
+    return path
+
+def sql_filter_clause(filters, group_columns):
+    """Translate the sidebar filters into a parameterized SQL WHERE clause.
+
+    ``group_columns`` maps each GROUP_THRESHOLDS filter to the column it groups by.
+    """
+    clauses = []
+    params = []
+    if filters['year']:
+        clauses.append('"year" = ?')
+        params.append(_canonical(filters['year']))
+    if filters['quarter']:
+        clauses.append('"Activity quarter" = ?')
+        params.append(_canonical(filters['quarter']))
+    if len(filters['date_range']) == 2:
+        clauses.append('"Activity date" BETWEEN ? AND ?')
+        params.extend(pd.Timestamp(day).strftime('%Y-%m-%d') for day in filters['date_range'])
+    
+    for name, column in DIMENSION_FILTERS.items():
+        if filters[name]:
+            clauses.append(f'{_sql_name(column)} IN ({", ".join("?" * len(filters[name]))})')
+            params.extend(_canonical(value) for value in filters[name])
+    
+    if filters['min_amount'] > 0:
+        clauses.append('"Billed & Unbilled hours value" >= ?')
+        params.append(_canonical(filters['min_amount']))
+    if len(filters['rate_range']) == 2:
+        clauses.append('"User rate" BETWEEN ? AND ?')
+        params.extend(_canonical(value) for value in filters['rate_range'])
+    if filters.get('exclude_quality'):
+        clauses.append('("Data quality flags" & ?) = 0')
+        params.append(quality_bits(filters['exclude_quality']))
+    
+    # Group-total thresholds are evaluated over the rows the other filters select
+    base, base_params = ' AND '.join(clauses) or '1 = 1', list(params)
+    for name, (_, measure) in GROUP_THRESHOLDS.items():
+        column = group_columns[name]
+        if (filters.get(name) or 0) > 0:
+            clauses.append(
+                f'{_sql_name(column)} IN (SELECT {_sql_name(column)} FROM entries WHERE {base} '
+                f'GROUP BY {_sql_name(column)} HAVING SUM({_sql_name(measure)}) >= ?)'
+            )
+            params.extend(base_params + [_canonical(filters[name]) - GROUP_THRESHOLD_TOLERANCE])
+    
+    return ' AND '.join(clauses) or '1 = 1', params
+
+@instrumented('query_sqlite')
+def query_sqlite(df, filters):
+    """Answer the metrics and chart aggregates with SQL pushed down to the shared SQLite store.
+
+    Only the one-row totals and the per-practice and per-attorney groups are
+    read back; the entries themselves never leave the database.
+    """
+    path = get_shared(df, 'sqlite_store', ensure_sqlite_store)
+    where, params = sql_filter_clause(filters, get_threshold_columns(df))
+    billable = '"Billed & Unbilled hours" > 0'
+    totals_sql = ', '.join(
+        [f'COALESCE(SUM({_sql_name(col)}), 0) AS {_sql_name(col)}' for col in ADDITIVE_MEASURES]
+        + [
+            f'COALESCE(SUM(CASE WHEN {billable} THEN "Billed & Unbilled hours" ELSE 0 END), 0) AS "Billable entry hours"',
+            f'COALESCE(SUM(CASE WHEN {billable} THEN "Billed & Unbilled hours value" ELSE 0 END), 0) AS "Billable entry value"',
+            'COUNT(*) AS "Entries"'
         ]
+    )
+    
+    with closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as conn:
+        totals = pd.read_sql_query(f'SELECT {totals_sql} FROM entries WHERE {where}', conn, params=params)
+        empty_selection = totals['Entries'].iloc[0] == 0
+        if empty_selection:
+            # Same fallback as query_pandas: show the whole dataset
+            where, params = '1 = 1', []
+            totals = pd.read_sql_query(f'SELECT {totals_sql} FROM entries', conn)
         
-        # Normalize size for scatter plot
-        min_size = 5
-        max_size = 20
-        attorney_data_clean['marker_size'] = (
-            (attorney_data_clean['Utilization Rate'] - attorney_data_clean['Utilization Rate'].min()) / 
-            (attorney_data_clean['Utilization Rate'].max() - attorney_data_clean['Utilization Rate'].min())
-        ) * (max_size - min_size) + min_size
+        practice_data = pd.read_sql_query(
+            f'SELECT "Practice area", SUM("Billed & Unbilled hours") AS "Billed & Unbilled hours", '
+            f'SUM("Billed & Unbilled hours value") AS "Billed & Unbilled hours value" '
+            f'FROM entries WHERE ({where}) AND "Practice area" IS NOT NULL GROUP BY 1 ORDER BY 1',
+            conn, params=params
+        )
+        attorney_data = pd.read_sql_query(
+            f'SELECT "User full name (first, last)", SUM("Billed & Unbilled hours") AS "Billed & Unbilled hours", '
+            f'SUM("Billed hours") AS "Billed hours", '
+            f'SUM("Billed & Unbilled hours value") AS "Billed & Unbilled hours value", '
+            f'SUM("Tracked hours") AS "Tracked hours" '
+            f'FROM entries WHERE ({where}) AND "User full name (first, last)" IS NOT NULL GROUP BY 1 ORDER BY 1',
+            conn, params=params
+        )
+    
+    row_count = int(totals['Entries'].iloc[0])
+    return {
+        'source': 'sqlite',
+        'empty_selection': empty_selection,
+        'row_count': row_count,
+        'metrics': calculate_metrics(totals),
+        'chart_data': {
+            'hours': hours_distribution(totals),
+            'practice': practice_data,
+            'attorney': attorney_data
+        } if row_count else None,
+        'figures': {}
+    }
+
+class ResultCache:
+    """Bounded, thread-safe LRU cache of per-filter results shared by all sessions.
+
+    Misses fall back to the results pre-built on disk in ``store_dir`` (see
+    ``python main.py report``), which are loaded into the cache on first use.
+    """
+    
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, store_dir=None):
+        self.max_entries = max_entries
+        self.store_dir = store_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+    
+    def _store_path(self, key):
+        return os.path.join(self.store_dir, f"{key}.pkl")
+    
+    def get(self, key):
+        """Return the cached result for ``key``, or None."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+        
+        result = self._load(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.loads += 1
+        self.put(key, result)
+        return result
+    
+    def _load(self, key):
+        """Return the pre-built result stored for ``key``, or None."""
+        if self.store_dir is None or not os.path.exists(self._store_path(key)):
+            return None
+        try:
+            with open(self._store_path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Ignoring unreadable stored result %s: %s", key, e)
+            return None
+    
+    def store(self, key, result):
+        """Cache a result and persist it, without its row selections, for other processes."""
+        self.put(key, result)
+        os.makedirs(self.store_dir, exist_ok=True)
+        stored = {name: value for name, value in result.items() if name not in RESULT_SELECTION_KEYS}
+        
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+        _write_atomic(self._store_path(key), write)
+    
+    def put(self, key, result):
+        """Store a result, evicting the least recently used ones beyond the bound."""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self):
+        """Return the hit, miss and eviction counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loads': self.loads
+            }
+
+@st.cache_resource
+def get_result_cache():
+    """Return the result cache shared by every session of this process."""
+    return ResultCache(store_dir=RESULT_STORE_DIR)
+
+def _canonical(value):
+    """Return a JSON-friendly form of a filter value that ignores multiselect order."""
+    if isinstance(value, list):
+        return sorted((_canonical(item) for item in value), key=repr)
+    if isinstance(value, tuple):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def result_cache_key(filters, dataset_version):
+    """Return a canonical hash of a filter set and the dataset version it applies to."""
+    payload = json.dumps(
+        {'dataset_version': dataset_version, 'filters': {name: _canonical(value) for name, value in filters.items()}},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_filtered_results(df, filters):
+    """Return the filtered row set, metrics and chart data of a filter set.
+
+    Results come from the configured query backend and are memoized in the
+    shared result cache. Figures are built lazily from the chart data by
+    get_figure and kept with the result as Plotly JSON.
+    """
+    cache = get_result_cache()
+    key = result_cache_key(filters, df.attrs.get('dataset_version'))
+    with stage('filtered_results', len(df)) as record:
+        result = cache.get(key)
+        record['cache'] = 'miss' if result is None else 'hit'
+        if result is None:
+            try:
+                result = QUERY_BACKENDS[QUERY_BACKEND](df, filters)
+            except sqlite3.Error as e:
+                st.error(f"Error querying the {QUERY_BACKEND} backend: {str(e)}")
+                result = query_pandas(df, filters)
+            
+            if not result.pop('failed', False):
+                cache.put(key, result)
+        record['rows_out'] = result['row_count']
+        return result
+
+def result_rows(df, filters, result):
+    """Return the positions of a filtered result's rows in its source (None = all), computing them on first request."""
+    if 'rows' not in result:
+        result['rows'] = filter_positions(select_source(df, filters), filters)
+    return result['rows']
+
+def result_entry_mask(df, filters, result):
+    """Return the bitmap of the entries a filtered result selects (None = all), computing it on first request.
+
+    It is kept with the cached result packed to one bit per entry, so the
+    panels read it on every rerun without holding a position array per
+    cached filter set.
+    """
+    if 'entry_mask' not in result:
+        mask = get_filter_index(df).mask(filters)
+        result['entry_mask'] = None if mask.all() else np.packbits(mask)
+    packed = result['entry_mask']
+    return None if packed is None else np.unpackbits(packed, count=len(df)).view(bool)
+
+def result_entry_rows(df, filters, result):
+    """Return the positions of the entries a filtered result selects (None = all)."""
+    mask = result_entry_mask(df, filters, result)
+    return None if mask is None else np.flatnonzero(mask)
+
+@instrumented('query_pandas')
+def query_pandas(df, filters):
+    """Answer the metrics and charts in-process from the rollup cube or the raw entries."""
+    source = select_source(df, filters)
+    failed = False
+    with stage('filter', len(source)) as record:
+        try:
+            rows = filter_positions(source, filters)
+        except Exception as e:
+            st.error(f"Error applying filters: {str(e)}")
+            rows = None
+            failed = True
         
-        fig_attorney = px.scatter(
-            attorney_data_clean,
-            x='Billed & Unbilled hours',
-            y='Billed & Unbilled hours value',
-            size='marker_size',
-            hover_name='User full name (first, last)',
-            title='Attorney Performance'
+        empty_selection = rows is not None and len(rows) == 0
+        view = source if rows is None or empty_selection else source.take(rows)
+        record['rows_out'] = len(view)
+    
+    chart_data = None
+    if not view.empty:
+        try:
+            hours_data, practice_data, attorney_data = aggregate_chart_data(view)
+            chart_data = {'hours': hours_data, 'practice': practice_data, 'attorney': attorney_data}
+        except Exception as e:
+            st.error(f"Error creating visualizations: {str(e)}")
+            failed = True
+    
+    return {
+        'source': 'entries' if source is df else 'cube',
+        'rows': rows,
+        'empty_selection': empty_selection,
+        'row_count': len(view) if source is df else int(view['Entries'].sum()),  # Entries per cube row
+        'metrics': calculate_metrics(view),
+        'chart_data': chart_data,
+        'figures': {},
+        'failed': failed
+    }
+
+# Query backends selectable through DASHBOARD_BACKEND
+QUERY_BACKENDS = {
+    'pandas': query_pandas,
+    'sqlite': query_sqlite
+}
+
+def display_comparison(comparison):
+    """Display the per-attorney and per-practice totals of the compared windows."""
+    counts = comparison['row_counts']
+    with st.expander("Period comparison by attorney and practice area"):
+        st.caption(
+            f"{counts['current']:,} entries in the selection, {counts['prior']:,} in the previous period, "
+            f"{counts['year_ago']:,} a year earlier"
         )
+        for column, breakdown in comparison['breakdowns'].items():
+            st.dataframe(breakdown.round(2), use_container_width=True, hide_index=True)
+
+def export_chunks(df, rows, columns=EXPORT_COLUMNS, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the ``columns`` of the entries at positions ``rows`` (None = all) in frames of at most ``chunk_rows``."""
+    n_rows = len(df) if rows is None else len(rows)
+    if n_rows == 0:
+        yield df[columns].iloc[:0]
+    for start in range(0, n_rows, chunk_rows):
+        chunk = np.arange(start, min(start + chunk_rows, n_rows)) if rows is None else rows[start:start + chunk_rows]
+        # Taking rows first keeps the copy chunk-sized (positional column selection copies whole blocks)
+        yield df.take(chunk)[columns]
+
+def write_csv(chunks, path):
+    """Write frames to one CSV file as they arrive."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for number, chunk in enumerate(chunks):
+            chunk.to_csv(f, header=number == 0, index=False)
+
+def write_parquet(chunks, path):
+    """Write frames to one Parquet file, one row group per frame."""
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                # Text columns that are empty in the first chunk still hold text later on
+                schema = pa.schema(
+                    [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema],
+                    metadata=table.schema.metadata
+                )
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_excel(chunks, path):
+    """Write frames to one Excel sheet through openpyxl's write-only (streaming) workbook."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Export')
+    written = 0
+    for number, chunk in enumerate(chunks):
+        written += len(chunk)
+        if written > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS:,} rows; export to CSV or Parquet instead")
+        if number == 0:
+            sheet.append(list(chunk.columns))
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+# Export formats: file extension, MIME type and chunk writer (Excel needs openpyxl)
+EXPORT_FORMATS = {
+    'CSV': {'extension': 'csv', 'mime': 'text/csv', 'write': write_csv},
+    'Parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet', 'write': write_parquet},
+    'Excel': {
+        'extension': 'xlsx',
+        'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'write': write_excel
+    }
+}
+
+def export_path(df, filters, table, export_format):
+    """Return where the export of a table of a filter set is kept."""
+    version = df.attrs.get('dataset_version', 'unversioned')
+    slug = table.lower().replace(' ', '_')
+    key = result_cache_key(filters, version)[:16]
+    return os.path.join(EXPORT_DIR, version, f"{slug}-{key}.{EXPORT_FORMATS[export_format]['extension']}")
+
+@instrumented('export')
+def prepare_export(df, filters, result, table, export_format):
+    """Write the export of a table of the filtered selection, unless another session already has, and return its path.
+
+    Entries stream from the filtered row positions to the file one chunk at
+    a time, so neither a filtered copy of the frame nor the serialized file
+    is ever held in memory whole. Exports of the previous
+    SHARED_VERSIONS_KEPT dataset versions are kept for pinned sessions.
+    """
+    path = export_path(df, filters, table, export_format)
+    if os.path.isfile(path):
+        return path
+    
+    version_dir = os.path.dirname(path)
+    os.makedirs(version_dir, exist_ok=True)
+    _prune_versions(glob.glob(os.path.join(EXPORT_DIR, '*')), version_dir)
+    
+    if EXPORT_TABLES[table] is None:
+        rows = result_entry_rows(df, filters, result)
+        if rows is not None and len(rows) == 0:
+            rows = None  # Same fallback as the dashboard: the whole dataset
+        chunks = export_chunks(df, rows)
+    else:
+        chunks = iter([result['chart_data'][EXPORT_TABLES[table]]])
+    _write_atomic(path, functools.partial(EXPORT_FORMATS[export_format]['write'], chunks))
+    return path
+
+def display_export(df, filters, result):
+    """Offer the filtered entries and their aggregates for download."""
+    with st.expander("Export"):
+        formats = [name for name in EXPORT_FORMATS if name != 'Excel' or openpyxl is not None]
+        table_col, format_col = st.columns(2)
+        table = table_col.radio("Table", options=list(EXPORT_TABLES), horizontal=True, key='export_table')
+        export_format = format_col.radio("Format", options=formats, horizontal=True, key='export_format')
+        if openpyxl is None:
+            format_col.caption("Install openpyxl to export to Excel.")
         
-        return fig_hours, fig_practice, fig_attorney
+        path = export_path(df, filters, table, export_format)
+        if not os.path.isfile(path):
+            # Written on request only, so reruns never pay for an export
+            if not st.button("Prepare export", key='export_prepare'):
+                return
+            try:
+                with st.spinner("Writing export..."):
+                    path = prepare_export(df, filters, result, table, export_format)
+            except Exception as e:
+                st.error(f"Error exporting data: {str(e)}")
+                return
         
-    except Exception as e:
-        st.error(f"Error creating visualizations: {str(e)}")
-        return None, None, None
+        spec = EXPORT_FORMATS[export_format]
+        try:
+            with open(path, 'rb') as f:
+                st.download_button(
+                    f"Download {table.lower()} ({os.fstat(f.fileno()).st_size / 1e6:,.1f} MB)",
+                    data=f,
+                    file_name=f"{table.lower().replace(' ', '_')}.{spec['extension']}",
+                    mime=spec['mime'],
+                    key='export_download'
+                )
+        except FileNotFoundError:
+            # Cleaned up by another session since it was written
+            st.warning("This export is no longer available. Rerun to prepare it again.")
+
+def debug_panel_enabled():
+    """Return whether this session shows the pipeline timings panel."""
+    return DEBUG_PANEL or st.query_params.get('debug') == '1'
+
+def display_debug_panel(records):
+    """Display the stage records of this rerun, nested by call depth."""
+    with st.expander("Pipeline timings", expanded=False):
+        if not records:
+            st.caption("No stages ran.")
+            return
+        top_level = sum(record['wall_ms'] or 0 for record in records if record['depth'] == 0)
+        st.caption(f"{len(records)} stages, {top_level:,.1f} ms at the top level")
+        timings = pd.DataFrame(records)
+        timings['stage'] = ['\u2003' * depth + name for depth, name in zip(timings['depth'], timings['stage'])]
+        st.dataframe(timings.drop(columns=['depth']), use_container_width=True, hide_index=True)
 
 def main():
+    with pipeline_run() as records:
+        render_dashboard()
+    if debug_panel_enabled():
+        display_debug_panel(records)
+
+def pinned_dataset(latest):
+    """Return the dataset this session works on, offering to switch once a newer one is swapped in.
+
+    A session keeps the version it started with so filters, results and
+    drilldowns stay consistent; new sessions start on the latest version.
+    """
+    state = st.session_state
+    pinned = state.get('dataset')
+    if pinned is None or latest is None:
+        state['dataset'] = latest
+        return latest
+    
+    if pinned.attrs.get('dataset_version') != latest.attrs.get('dataset_version'):
+        notice_col, button_col = st.columns([4, 1])
+        notice_col.info(f"Newer data was loaded at {latest.attrs['loaded_at']:%B %d, %Y %H:%M}.")
+        if button_col.button("Switch to latest data", key='switch_dataset'):
+            state['dataset'] = latest
+            st.rerun()
+    return pinned
+
+def render_dashboard():
+    """Render the dashboard page."""
     st.title("Legal Dashboard")
     
     # Load data
-    with st.spinner('Loading data...'):
-        df = load_and_process_data()
+    with st.spinner('Loading data...'), stage('load_data') as record:
+        record['cache'] = 'hit'
+        df = pinned_dataset(load_and_process_data())
+        record['rows_out'] = None if df is None else len(df)
     
     if df is not None:
         # Add refresh date
         st.markdown(
             f"""
             <div style='text-align: right; color: gray; font-size: 0.8em;'>
-            Last Refresh: {datetime.now().strftime("%B %d, %Y")}
+            Last Refresh: {df.attrs.get('loaded_at', datetime.now()).strftime("%B %d, %Y %H:%M")}
             </div>
             """,
             unsafe_allow_html=True
@@ -602,32 +3305,216 @@ def main():
         # Create filters
         filters = create_sidebar_filters(df)
         
-        # Apply filters
-        filtered_df = filter_data(df, filters)
+        # Apply filters, calculate metrics and aggregate chart data (memoized per filter set)
+        result = get_filtered_results(df, filters)
+        cache_stats = get_result_cache().stats()
+        st.sidebar.caption(
+            f"Result cache: {cache_stats['hits']} hits ({cache_stats['loads']} pre-built), {cache_stats['misses']} misses, "
+            f"{cache_stats['evictions']} evictions ({cache_stats['entries']}/{cache_stats['max_entries']} entries)"
+        )
+        
+        if result['empty_selection']:
+            st.warning("No data available for the selected filters. Please adjust your criteria.")
         
-        if not filtered_df.empty:
-            # Calculate and display metrics
-            metrics = calculate_metrics(filtered_df)
-            display_metrics(metrics)
+        if result['row_count'] > 0:
+            # Display metrics with their year-end projection, compared with an earlier window when requested
+            try:
+                projection = get_projection(df, filters)
+            except Exception as e:
+                st.error(f"Error projecting year-end totals: {str(e)}")
+                projection = None
+            compare_col, baseline_col = st.columns([1, 3])
+            with compare_col:
+                compare = st.toggle("Compare periods", key='compare_periods')
+            if compare:
+                with baseline_col:
+                    baseline_label = st.radio(
+                        "Compare with", options=list(COMPARISON_BASELINES), horizontal=True, key='compare_baseline'
+                    )
+                comparison = get_comparison(df, filters, result)
+                baseline = COMPARISON_BASELINES[baseline_label]
+                display_metrics(result['metrics'], comparison['metrics'][baseline], baseline_label.lower(), projection)
+                display_comparison(comparison)
+            else:
+                display_metrics(result['metrics'], projection=projection)
+            if projection is not None:
+                display_projection(projection)
+            
+            # Only the opened chart is built and sent to the browser
+            chart_col, detail_col = st.columns([4, 1])
+            with chart_col:
+                chart = st.radio("Chart", options=list(CHARTS), horizontal=True, key='chart_view')
+            with detail_col:
+                full_detail = st.checkbox(
+                    "Full detail",
+                    key='chart_full_detail',
+                    help=f"Plot every attorney and practice area instead of the top {CHART_POINT_BUDGET}"
+                )
+            
+            fig = get_figure(result, chart, full_detail)
+            if fig:
+                st.plotly_chart(fig, use_container_width=True)
+            
+            display_export(df, filters, result)
             
-            # Create visualizations
-            fig_hours, fig_practice, fig_attorney = create_visualizations(filtered_df)
+            display_trends(df, filters, result)
             
-            if fig_hours and fig_practice and fig_attorney:
-                # Display visualizations
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.plotly_chart(fig_hours, use_container_width=True)
-                
-                with col2:
-                    st.plotly_chart(fig_practice, use_container_width=True)
-                
-                st.plotly_chart(fig_attorney, use_container_width=True)
+            display_capacity(df, filters, result)
+            
+            display_drilldown(df, filters, result)
+            
+            display_data_quality(df, filters, result)
         else:
             st.warning("No data available for the selected filters. Please adjust your criteria.")
     else:
         st.error("Error loading data. Please check the data source and try again.")
 
+def preset_filters(df, overrides):
+    """Return the default filter set with a preset's JSON overrides applied."""
+    filters = default_filters(df)
+    for name, value in overrides.items():
+        if name not in filters:
+            raise ValueError(f"Unknown filter in preset: {name}")
+        if name == 'date_range':
+            value = tuple(date.fromisoformat(day) for day in value)
+        elif name == 'rate_range':
+            value = tuple(float(rate) for rate in value)
+        elif name in ('year', 'min_hours', 'min_amount', 'min_client_hours') and value is not None:
+            value = float(value)
+        elif name in DIMENSION_FILTERS or name == 'exclude_quality':
+            value = list(value)
+        filters[name] = value
+    return filters
+
+def default_report_presets(df):
+    """Return the presets built when no presets file is given: the quarters of the latest year with entries."""
+    year = default_filters(df)['year']
+    if year is None:
+        return {}
+    quarters = df.loc[df['year'] == year, 'Activity quarter'].dropna().unique()
+    return {
+        REPORT_PRESET_NAME.format(quarter=quarter): {'quarter': str(quarter)}
+        for quarter in sorted(quarters, key=int)
+    }
+
+_report_df = None
+
+def _init_report_worker():
+    """Load the dataset once per report worker process."""
+    global _report_df
+    _report_df = load_exports(DATA_FILES)
+
+def run_report(name, filters, out_dir):
+    """Build one preset: its result (stored for the dashboard), metrics JSON and chart HTML files.
+    
+    A preset matching no entries is written as empty (no metrics or charts) rather than with the
+    whole-dataset fallback the dashboard shows.
+    """
+    df = _report_df
+    result = get_filtered_results(df, filters)
+    empty_selection = bool(result['empty_selection'])
+    
+    preset_dir = os.path.join(out_dir, name)
+    os.makedirs(preset_dir, exist_ok=True)
+    for chart in CHARTS:
+        slug = chart.lower().replace(' ', '_')
+        chart_path = os.path.join(preset_dir, f"{slug}.html")
+        fig = None if empty_selection else get_figure(result, chart)
+        if fig:
+            _write_atomic(chart_path, lambda tmp_path: fig.write_html(tmp_path, include_plotlyjs='cdn'))
+        elif os.path.exists(chart_path):
+            os.remove(chart_path)  # left by an earlier run whose selection had entries
+    
+    # Persist the result with its figures already serialized, so the dashboard serves it with no compute
+    key = result_cache_key(filters, df.attrs.get('dataset_version'))
+    get_result_cache().store(key, result)
+    
+    report = {
+        'preset': name,
+        'dataset_version': df.attrs.get('dataset_version'),
+        'result_key': key,
+        'filters': {filter_name: _canonical(value) for filter_name, value in filters.items()},
+        'empty_selection': empty_selection,
+        'row_count': 0 if empty_selection else int(result['row_count']),
+        'metrics': {} if empty_selection else {
+            metric: round(float(value), REPORT_DECIMALS) for metric, value in result['metrics'].items()
+        }
+    }
+    _write_json(os.path.join(preset_dir, 'metrics.json'), report)
+    return report
+
+def run_reports(presets, out_dir, workers=None):
+    """Build every preset in a process pool and write an index of the reports to ``out_dir``.
+    
+    ``presets`` of None builds default_report_presets.
+    """
+    df = load_exports(DATA_FILES)  # ingest once, so workers only read the snapshot
+    if presets is None:
+        presets = default_report_presets(df)
+    jobs = {name: preset_filters(df, overrides) for name, overrides in presets.items()}
+    
+    # Results of earlier dataset versions can never be hit again
+    shutil.rmtree(RESULT_STORE_DIR, ignore_errors=True)
+    os.makedirs(out_dir, exist_ok=True)
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_report_worker) as pool:
+        futures = {name: pool.submit(run_report, name, filters, out_dir) for name, filters in jobs.items()}
+        reports = {}
+        for name, future in futures.items():
+            reports[name] = future.result()
+            if reports[name]['empty_selection']:
+                logger.warning("Report %s: no entries match the preset, written as empty", name)
+            else:
+                logger.info("Report %s: %d entries", name, reports[name]['row_count'])
+    
+    _write_json(os.path.join(out_dir, 'index.json'), reports)
+    return reports
+
+def run_publisher(watch=0):
+    """Publish the processed exports as shared columns, then keep republishing every ``watch`` seconds."""
+    while True:
+        df = load_exports(DATA_FILES)
+        publish_columns(df)
+        if not watch:
+            return df.attrs['dataset_version']
+        time.sleep(watch)
+
+def run_cli(argv):
+    """Entry point of ``python main.py report`` and ``python main.py publish``."""
+    parser = argparse.ArgumentParser(prog='main.py', description="Run dashboard jobs headlessly.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    report = commands.add_parser('report', help="Build dashboard reports for filter presets")
+    report.add_argument('--presets', help="JSON file mapping preset names to filter overrides")
+    report.add_argument('--out', default='reports', help="Directory the reports are written to")
+    report.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    
+    publish = commands.add_parser(
+        'publish', help="Publish the processed data for dashboards running with DASHBOARD_DATASET_SOURCE=shared"
+    )
+    publish.add_argument('--watch', type=float, default=0,
+                         help="Keep running and republish changes every this many seconds")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    if args.command == 'publish':
+        version = run_publisher(args.watch)
+        print(f"Published dataset version {version} to {SHARED_COLUMNS_DIR}")
+        return 0
+    
+    presets = None
+    if args.presets:
+        with open(args.presets) as f:
+            presets = json.load(f)
+    
+    reports = run_reports(presets, args.out, args.workers)
+    print(f"Wrote {len(reports)} reports to {args.out}")
+    return 0
+
+# Subcommands handled by run_cli; anything else runs the dashboard
+CLI_COMMANDS = ['report', 'publish']
+
 if __name__ == "__main__":
+    if sys.argv[1:2] and sys.argv[1] in CLI_COMMANDS:
+        sys.exit(run_cli(sys.argv[1:]))
     main()